@@ -11,62 +11,122 @@
 from __future__ import division, print_function, unicode_literals
 import objc
 import os
-import json
-import textwrap
+import time
+import threading
+from functools import lru_cache
+from contextlib import contextmanager
 from GlyphsApp import Glyphs, WINDOW_MENU, GSGlyphsInfo, Message
 from GlyphsApp.plugins import GeneralPlugin
-from AppKit import NSMenuItem, NSFont, NSColor, NSAttributedString, NSImage, NSEvent, NSOpenPanel, NSScreen, NSEventMaskKeyDown, NSFileHandlingPanelOKButton, NSForegroundColorAttributeName, NSFontAttributeName, NSCalibratedRGBColorSpace, NSImageScaleProportionallyUpOrDown  # type: ignore
-import vanilla
+# vanilla, textwrap and the rest of AppKit are imported where they are used,
+# so Glyphs launches that never open the wall do not pay for them
+from AppKit import NSMenuItem  # type: ignore
+from wallscript import ROWS, COLS, SLOTS, STORE_VERSION, DEFAULT_SLOT_KEYS, DEFAULT_PAGE_MODIFIER, KeyMap, RelocationIndex, check_scripts, MetadataCache, find_scripts, read_metadata, LRUCache, BytecodeCache, CodeCache, ScriptIndex, ScriptRunner, UsageCounter, Wall, WallStore
 
 
+STORE_FILE = os.path.join(GSGlyphsInfo.applicationSupportPath(), "Wall Script.json")
+BYTECODE_DIR = os.path.join(GSGlyphsInfo.applicationSupportPath(), "Wall Script Cache")
+PROFILE_DIR = os.path.join(GSGlyphsInfo.applicationSupportPath(), "Wall Script Profiles")
+SCRIPTS_DIR = os.path.join(GSGlyphsInfo.applicationSupportPath(), "Scripts")
+METADATA_FILE = os.path.join(GSGlyphsInfo.applicationSupportPath(), "Wall Script Metadata.json")
+USAGE_FILE = os.path.join(GSGlyphsInfo.applicationSupportPath(), "Wall Script Usage.json")
+DEFAULTS_PREFIX = "com.RezaBohloul.WallScript"
+
+# Legacy files, only read once to migrate into STORE_FILE
 SCRIPT_FILE = os.path.join(GSGlyphsInfo.applicationSupportPath(), "Wall Script.txt")
 COLOR_FILE = os.path.join(GSGlyphsInfo.applicationSupportPath(), "Wall Script Colors.txt")
 
-TOTAL_SUB_WINDOWS = 4
-ROWS = 4
-COLS = 4
 BOX_HEIGHT = 90
 BOX_WIDTH = 140
 GRID_SPACING = 10
 TITLE_BAR_HEIGHT = 45
 FONT_SIZE = 12
-FONT_BOLD = NSFont.boldSystemFontOfSize_(FONT_SIZE)
+CODE_CACHE_SIZE = 64
+RENDER_CACHE_SIZE = 256
+PALETTE_MATCHES = 12
+CUSTOM_COLORS = 3
+STORE_POLL_INTERVAL = 2.0
+
+# The Hot page sits left of the first wall and shows the most launched scripts
+HOT_PAGE = -1
 
+# RGBA, like the colors stored in the wall
 PREDEFINED_COLORS = [
-    NSColor.redColor(),
-    NSColor.colorWithRed_green_blue_alpha_(0.0, 0.85, 0.0, 1.0),
-    NSColor.blueColor(),
-    NSColor.colorWithRed_green_blue_alpha_(1.0, 0.75, 0.0, 1.0),
-    NSColor.colorWithRed_green_blue_alpha_(0.5, 0.0, 0.25, 1.0),
-    NSColor.colorWithRed_green_blue_alpha_(0.0, 0.5, 0.0, 1.0),
-    NSColor.colorWithRed_green_blue_alpha_(0.0, 0.0, 0.55, 1.0),
-    NSColor.orangeColor(),
-    NSColor.magentaColor(),
-    NSColor.colorWithRed_green_blue_alpha_(0.5, 0.0, 1.0, 1.0),
-    NSColor.colorWithRed_green_blue_alpha_(0.0, 0.8, 0.8, 1.0),
-    NSColor.brownColor(),
-    NSColor.colorWithRed_green_blue_alpha_(1.0, 0.0, 0.5, 1.0),
-    NSColor.colorWithRed_green_blue_alpha_(0.25, 0.0, 0.5, 1.0),
-    NSColor.colorWithRed_green_blue_alpha_(0.0, 0.4, 0.5, 1.0),
-    NSColor.colorWithRed_green_blue_alpha_(1.0, 1.0, 1.0, 0.1)
+    (1.0, 0.0, 0.0, 1.0),
+    (0.0, 0.85, 0.0, 1.0),
+    (0.0, 0.0, 1.0, 1.0),
+    (1.0, 0.75, 0.0, 1.0),
+    (0.5, 0.0, 0.25, 1.0),
+    (0.0, 0.5, 0.0, 1.0),
+    (0.0, 0.0, 0.55, 1.0),
+    (1.0, 0.5, 0.0, 1.0),
+    (1.0, 0.0, 1.0, 1.0),
+    (0.5, 0.0, 1.0, 1.0),
+    (0.0, 0.8, 0.8, 1.0),
+    (0.6, 0.4, 0.2, 1.0),
+    (1.0, 0.0, 0.5, 1.0),
+    (0.25, 0.0, 0.5, 1.0),
+    (0.0, 0.4, 0.5, 1.0),
+    (1.0, 1.0, 1.0, 0.1)
 ]
 
 
+@lru_cache(maxsize=None)
+def bold_font():
+    from AppKit import NSFont  # type: ignore
+    return NSFont.boldSystemFontOfSize_(FONT_SIZE)
+
+
 def nscolor_to_rgb(color):
     """Convert NSColor to an RGB tuple."""
+    from AppKit import NSCalibratedRGBColorSpace  # type: ignore
     color = color.colorUsingColorSpaceName_(NSCalibratedRGBColorSpace)
     return (color.redComponent(), color.greenComponent(), color.blueComponent(), color.alphaComponent())
 
 
 def rgb_to_nscolor(rgb):
     """Convert an RGB tuple to NSColor."""
+    from AppKit import NSColor  # type: ignore
     return NSColor.colorWithRed_green_blue_alpha_(rgb[0], rgb[1], rgb[2], rgb[3])
 
 
+@contextmanager
+def undo_group(font, name):
+    """Group every change made inside the block into a single undo step.
+
+    Glyphs records glyph and layer edits on each glyph's own undo manager,
+    so every glyph gets an undo group as well as the document; groups that
+    stay empty are dropped by their undo manager.
+    """
+    document = font.parent if font is not None else None
+    undo_manager = document.undoManager() if document is not None else None
+    if undo_manager is None:
+        yield
+        return
+    glyphs = list(font.glyphs)
+    undo_manager.beginUndoGrouping()
+    for glyph in glyphs:
+        glyph.beginUndo()
+    font.disableUpdateInterface()
+    try:
+        yield
+    finally:
+        font.enableUpdateInterface()
+        for glyph in glyphs:
+            glyph.endUndo()
+        undo_manager.setActionName_(name)
+        undo_manager.endUndoGrouping()
+
+
 class WallScript(GeneralPlugin):
 
     w = None
     color_window = None
+    custom_color = None
+    color_panel_shown = False
+    report_window = None
+    palette = None
+    macro_window = None
+    store_timer = None
 
     @objc.python_method
     def settings(self):
@@ -74,11 +134,54 @@ class WallScript(GeneralPlugin):
             'en': 'Wall Script',
         })
 
-        self.scripts = {}  # Initialize the scripts attribute
-        self.load_scripts()
-        self.load_colors()
+        self.bytecode_cache = BytecodeCache(BYTECODE_DIR)
+        self.code_cache = CodeCache(CODE_CACHE_SIZE, self.bytecode_cache)
+        self.render_cache = LRUCache(RENDER_CACHE_SIZE)
+        self.runner = ScriptRunner(self.code_cache)
+        self.run_stats = self.runner.run_stats
+        self.store = WallStore(STORE_FILE, SCRIPT_FILE, COLOR_FILE, on_conflict=self.store_conflict)
+        self.missing_scripts = set()
+        self.relocation_index = None
+        self.metadata = None
+        self.usage = None
+        self.hot_boxes = []
+        self.wall = None
         self.current_sub_window = 0
-        self.update_total_sub_windows()
+
+    @objc.python_method
+    def load(self):
+        """Read everything the wall needs; runs on the first showWindow_, not at Glyphs launch."""
+        self.usage = UsageCounter(USAGE_FILE)
+        self.custom_colors = [[float(component) for component in color] for color in Glyphs.defaults[f"{DEFAULTS_PREFIX}.customColors"] or ()]
+        self.load_wall()
+        # Precompile every script on the wall in the background
+        self.bytecode_cache.warm_up({box.script for _, _, box in self.wall.boxes() if box.script})
+        self.start_integrity_scan()
+
+    @objc.python_method
+    def start_integrity_scan(self):
+        """Check every script path of the wall on a background thread."""
+        scripts = [(box.script, box.digest) for _, _, box in self.wall.boxes() if box.script]
+        threading.Thread(target=self.integrity_scan, args=(scripts,), daemon=True).start()
+
+    @objc.python_method
+    def integrity_scan(self, scripts):
+        missing, digests = check_scripts(scripts)
+        relocation_index = RelocationIndex().scan(SCRIPTS_DIR) if missing else None
+        self.performSelectorOnMainThread_withObject_waitUntilDone_("integrityScanFinished:", (missing, digests, relocation_index), False)
+
+    def integrityScanFinished_(self, result):
+        missing, digests, relocation_index = result
+        if digests:
+            for _, _, box in self.wall.boxes():
+                if box.digest is None and box.script in digests:
+                    box.digest = digests[box.script]
+            self.save_wall()
+        self.missing_scripts = set(missing)
+        self.relocation_index = relocation_index
+        if self.w is not None:
+            self.update_subview(self.current_sub_window)
+            self.update_relink_button()
 
     @objc.python_method
     def start(self):
@@ -93,18 +196,30 @@ class WallScript(GeneralPlugin):
 
     def showWindow_(self, sender):
         """Do something like show a window """
+        from AppKit import NSTimer  # type: ignore
+        if self.wall is None:
+            self.load()
+        else:
+            self.merge_store()
         if self.w is None:
             self.make_main_window()
+        if self.store_timer is None:
+            self.store_timer = NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(STORE_POLL_INTERVAL, self, "pollStore:", None, True)
         self.w.open()
 
     # Place color window buttons without text in the center of the screen.
     @objc.python_method
-    def make_color_window(self, color_options, callback, box_index):
+    def make_color_window(self):
+        """Build the color picker once; show_color_picker only retargets and shows it."""
+        import vanilla
+        from AppKit import NSImage, NSScreen, NSImageScaleProportionallyUpOrDown  # type: ignore
         BUTTON_SIZE = 40
         BUTTONS_PER_ROW = 4
         GRID_SPACING = 20
+        button_count = len(PREDEFINED_COLORS) + CUSTOM_COLORS + 1
+        rows = -(-button_count // BUTTONS_PER_ROW)
         width = BUTTONS_PER_ROW * (BUTTON_SIZE + GRID_SPACING) + GRID_SPACING - 10
-        height = (len(color_options) / BUTTONS_PER_ROW) * (BUTTON_SIZE + GRID_SPACING) + GRID_SPACING - 8
+        height = rows * (BUTTON_SIZE + GRID_SPACING) + GRID_SPACING - 8
 
         # Create the window with default position
         w = vanilla.Window((width, height), "Select Color", closable=True)
@@ -119,32 +234,44 @@ class WallScript(GeneralPlugin):
         # Set the window's position
         w.setPosSize((x_pos, y_pos, width, height))
 
-        for i, color in enumerate(color_options):
+        for i in range(button_count):
             row = i // BUTTONS_PER_ROW
             col = i % BUTTONS_PER_ROW
             x_pos = GRID_SPACING + col * (BUTTON_SIZE + GRID_SPACING) - 5
             y_pos = GRID_SPACING + row * (BUTTON_SIZE + GRID_SPACING) - 5
 
+            if i == button_count - 1:
+                # The last button picks any other color from the system color panel
+                button = vanilla.Button((x_pos, y_pos, BUTTON_SIZE, BUTTON_SIZE), "", callback=self.show_color_panel)
+                button.getNSButton().setImage_(NSImage.imageNamed_("NSAddTemplate"))
+                button.getNSButton().setBordered_(False)
+                w.more_button = button
+                continue
+
             # Create vanilla button with no title
-            button = vanilla.Button((x_pos, y_pos, BUTTON_SIZE, BUTTON_SIZE), "", callback=callback)
-            button.color = color
+            button = vanilla.Button((x_pos, y_pos, BUTTON_SIZE, BUTTON_SIZE), "", callback=self.color_selected)
+            button.color = PREDEFINED_COLORS[i] if i < len(PREDEFINED_COLORS) else None
 
             # Get NSButton instance from vanilla button
             ns_button = button.getNSButton()
             ns_button.setWantsLayer_(True)
-            ns_button.layer().setBackgroundColor_(color.CGColor())
+            if button.color is not None:
+                ns_button.layer().setBackgroundColor_(rgb_to_nscolor(button.color).CGColor())
             ns_button.layer().setCornerRadius_(5)
             ns_button.layer().setBorderWidth_(0)
             ns_button.setBordered_(False)
             ns_button.setImageScaling_(NSImageScaleProportionallyUpOrDown)
-            button.box_index = box_index
             setattr(w, f"button_{i}", button)
 
+        # Closing only hides the picker so it can be shown again
+        w.bind("should close", self.hide_color_picker)
         return w
 
     @objc.python_method
     def make_main_window(self):
         # Get screen dimensions and center the window
+        import vanilla
+        from AppKit import NSFont, NSColor, NSImage, NSScreen, NSImageScaleProportionallyUpOrDown  # type: ignore
         screen_frame = NSScreen.mainScreen().frame()
         window_width = BOX_WIDTH * COLS + GRID_SPACING * 2
         window_height = BOX_HEIGHT * ROWS + TITLE_BAR_HEIGHT + GRID_SPACING * 2
@@ -154,14 +281,13 @@ class WallScript(GeneralPlugin):
         # Main window initialization centered on the screen
         self.w = vanilla.Window((window_x, window_y, window_width, window_height), closable=True)
 
-        self.total_sub_windows = TOTAL_SUB_WINDOWS
-
 #       Top window color & title
         self.w.titleBackground = vanilla.Group((0, 0, window_width, TITLE_BAR_HEIGHT))
         self.w.titleBackground.getNSView().setWantsLayer_(True)
         self.w.titleBackground.getNSView().layer().setBackgroundColor_(NSColor.keyboardFocusIndicatorColor().CGColor())
         self.w.titleLabel = vanilla.TextBox((window_width / 2 - 165, 16, 330, 20), "Wall Script", alignment="center")
         self.w.titleLabel.getNSTextField().setFont_(NSFont.systemFontOfSize_(16))
+        self.w.titleLabel.getNSTextField().setToolTip_(f"Script cache: {self.code_cache.summary()}")
 
 #        self.w.titleLabel2 = vanilla.TextBox((12 - 0, window_height - 10, 330, 20), "Wall Script - V.1 - By: Reza Bohloul", alignment="left")
 #        self.w.titleLabel2.getNSTextField().setFont_(NSFont.systemFontOfSize_(7))
@@ -181,6 +307,33 @@ class WallScript(GeneralPlugin):
         self.w.delete_button.getNSButton().setBordered_(False)
         self.w.delete_button.getNSButton().setImageScaling_(NSImageScaleProportionallyUpOrDown)
 
+        self.w.report_button = vanilla.Button((70, 14, 14, 14), "", callback=self.show_run_report)
+        self.w.report_button.getNSButton().setImage_(NSImage.imageNamed_("NSListViewTemplate"))
+        self.w.report_button.getNSButton().setBordered_(False)
+        self.w.report_button.getNSButton().setImageScaling_(NSImageScaleProportionallyUpOrDown)
+
+        self.w.relink_button = vanilla.Button((92, 14, 14, 14), "", callback=self.relink_missing)
+        self.w.relink_button.getNSButton().setImage_(NSImage.imageNamed_("NSCaution"))
+        self.w.relink_button.getNSButton().setBordered_(False)
+        self.w.relink_button.getNSButton().setImageScaling_(NSImageScaleProportionallyUpOrDown)
+        self.w.relink_button.getNSButton().setToolTip_("Relink missing scripts")
+        self.update_relink_button()
+
+        self.w.import_button = vanilla.Button((114, 14, 14, 14), "", callback=self.import_folder)
+        self.w.import_button.getNSButton().setImage_(NSImage.imageNamed_("NSFolder"))
+        self.w.import_button.getNSButton().setBordered_(False)
+        self.w.import_button.getNSButton().setImageScaling_(NSImageScaleProportionallyUpOrDown)
+        self.w.import_button.getNSButton().setToolTip_("Import a folder of scripts")
+
+        self.w.macro_button = vanilla.Button((136, 14, 14, 14), "", callback=self.show_macros)
+        self.w.macro_button.getNSButton().setImage_(NSImage.imageNamed_("NSSlideshowTemplate"))
+        self.w.macro_button.getNSButton().setBordered_(False)
+        self.w.macro_button.getNSButton().setImageScaling_(NSImageScaleProportionallyUpOrDown)
+        self.w.macro_button.getNSButton().setToolTip_("Macros")
+
+        if self.metadata is None:
+            self.metadata = MetadataCache(METADATA_FILE)
+
         self.w.subview = vanilla.Group((GRID_SPACING, TITLE_BAR_HEIGHT + GRID_SPACING, window_width, BOX_HEIGHT * ROWS))
         self.update_subview(self.current_sub_window)
 
@@ -194,6 +347,7 @@ class WallScript(GeneralPlugin):
         self.w.left_button.getNSButton().setBordered_(False)
         self.w.left_button.getNSButton().setImageScaling_(NSImageScaleProportionallyUpOrDown)
 
+        self.keymap = self.load_keymap()
         self.add_key_event_monitor()
         self.w.bind("close", self.remove_key_event_monitor)
 
@@ -201,244 +355,771 @@ class WallScript(GeneralPlugin):
     def title_edited(self, sender):
         title = sender.get()
         if not title.strip():
-            title = f"Wall Script {self.current_sub_window + 1}"
+            title = self.page_title(self.current_sub_window)
         self.w.titleLabel.set(title)
 
-    @objc.python_method
-    def update_total_sub_windows(self):
-        if os.path.exists(SCRIPT_FILE):
-            with open(SCRIPT_FILE, 'r', encoding='utf-8') as file:
-                first_line = file.readline().strip()
-                if first_line.startswith("TOTAL_SUB_WINDOWS="):
-                    global TOTAL_SUB_WINDOWS
-                    TOTAL_SUB_WINDOWS = int(first_line.split('=')[1])
-                    self.total_sub_windows = TOTAL_SUB_WINDOWS
-
     @objc.python_method
     def update_subview(self, index):
-        for name in dir(self.w.subview):
-            if name.startswith("button_") or name.startswith("tiny_button_") or name.startswith("color_button_") or name.startswith("remove_button_"):
-                delattr(self.w.subview, name)
-
-        self.create_sub_window(index)
+        # The 16 boxes are built once per window and only rebound to the new page.
+        if not hasattr(self.w.subview, "button_0"):
+            self.create_sub_window()
+
+        if index == HOT_PAGE:
+            # Each Hot box is bound to the first box running its script
+            located = self.wall.locate_all(self.usage.top)
+            self.hot_boxes = [page * SLOTS + slot for page, slot in (located[script] for script in self.usage.top if script in located)]
+            box_indexes = self.hot_boxes + [None] * (SLOTS - len(self.hot_boxes))
+        else:
+            box_indexes = range(index * SLOTS, (index + 1) * SLOTS)
+        for idx, box_index in enumerate(box_indexes):
+            self.bind_box(idx, box_index)
+        self.show_box_controls(index != HOT_PAGE)
 
         current_title = self.w.titleLabel.get()
         if current_title.startswith("Wall Script"):
-            self.w.titleLabel.set(f"Wall Script {index + 1}")
+            self.w.titleLabel.set(self.page_title(index))
+
+    @objc.python_method
+    def page_title(self, index):
+        return "Wall Script Hot" if index == HOT_PAGE else f"Wall Script {index + 1}"
 
     @objc.python_method
-    def create_sub_window(self, index):
-        gray_color = NSColor.systemGrayColor()
-        blue_color = NSColor.systemBlueColor()
+    def show_box_controls(self, shown):
+        """Show the edit buttons of every box; the Hot page is only for launching."""
+        if self.box_controls_shown == shown:
+            return
+        self.box_controls_shown = shown
+        for idx in range(SLOTS):
+            for name in ("tiny_button", "color_button", "remove_button"):
+                getattr(self.w.subview, f"{name}_{idx}").show(shown)
+
+    @objc.python_method
+    def create_sub_window(self):
+        import vanilla
+        from AppKit import NSImage  # type: ignore
+        self.box_titles = [None] * SLOTS
+        self.box_colors = [None] * SLOTS
+        self.box_controls_shown = True
         idx = 0
         for row in range(ROWS):
             for col in range(COLS):
-                box_index = row * COLS + col + index * COLS * ROWS
                 x_pos = col * BOX_WIDTH
                 y_pos = row * BOX_HEIGHT
-                script_name = self.scripts.get(f"box_{box_index}", "No Script")
-                display_name = os.path.basename(script_name) if script_name != "No Script" else script_name
-                wrapped_name = "\n".join(textwrap.wrap(display_name, width=19))
 
                 button = vanilla.Button((x_pos + 8, y_pos + 6, BOX_WIDTH - GRID_SPACING - 6, BOX_HEIGHT - GRID_SPACING - 6), "", callback=self.run_script)
                 setattr(self.w.subview, f"button_{idx}", button)
-                button.box_index = box_index
                 button.getNSButton().setWantsLayer_(True)
                 button_layer = button.getNSButton().layer()
                 button_layer.setCornerRadius_(5)
                 button_layer.setShadowOpacity_(0)
                 button.getNSButton().setBordered_(False)
 
-                saved_color_rgb = self.button_colors.get(f"box_{box_index}", None)
-                if saved_color_rgb:
-                    color = rgb_to_nscolor(saved_color_rgb)
-                    button_layer.setBackgroundColor_(color.CGColor())
-                else:
-                    button_layer.setBackgroundColor_(gray_color.CGColor() if script_name == "No Script" else blue_color.CGColor())
-
-                attributed_title = NSAttributedString.alloc().initWithString_attributes_(
-                    wrapped_name, {
-                        NSForegroundColorAttributeName: NSColor.whiteColor(),
-                        NSFontAttributeName: FONT_BOLD
-                    }
-                )
-                button.getNSButton().setAttributedTitle_(attributed_title)
                 tiny_button = vanilla.Button((x_pos + 2, y_pos + BOX_HEIGHT - 24, 22, 22), "", callback=self.change_script)
                 setattr(self.w.subview, f"tiny_button_{idx}", tiny_button)
                 tiny_button.getNSButton().setImage_(NSImage.imageNamed_("NSAddTemplate"))
                 tiny_button.getNSButton().setBordered_(False)
-                tiny_button.box_index = box_index
 
                 color_button = vanilla.Button((x_pos + (BOX_WIDTH / 2) - 12, y_pos + BOX_HEIGHT - 24, 22, 22), "", callback=self.show_color_picker)
                 setattr(self.w.subview, f"color_button_{idx}", color_button)
                 color_button.getNSButton().setImage_(NSImage.imageNamed_("NSActionTemplate"))
                 color_button.getNSButton().setBordered_(False)
-                color_button.box_index = box_index
 
                 remove_button = vanilla.Button((x_pos + BOX_WIDTH - 24, y_pos + BOX_HEIGHT - 24, 22, 22), "", callback=self.remove_script)
                 setattr(self.w.subview, f"remove_button_{idx}", remove_button)
                 remove_button.getNSButton().setImage_(NSImage.imageNamed_("GSDisabledTemplate"))
                 remove_button.getNSButton().setBordered_(False)
-                remove_button.box_index = box_index
 
                 idx += 1
 
+    @objc.python_method
+    def bind_box(self, idx, box_index):
+        """Point the controls of slot idx at box_index and redraw only what changed."""
+        subview = self.w.subview
+        button = getattr(subview, f"button_{idx}")
+        button.box_index = box_index
+        getattr(subview, f"tiny_button_{idx}").box_index = box_index
+        getattr(subview, f"color_button_{idx}").box_index = box_index
+        getattr(subview, f"remove_button_{idx}").box_index = box_index
+
+        box = self.wall.box(*divmod(box_index, SLOTS)) if box_index is not None else None
+        attributed_title, background_color = self.box_render(box)
+
+        if self.box_colors[idx] is not background_color:
+            self.box_colors[idx] = background_color
+            button.getNSButton().layer().setBackgroundColor_(background_color)
+
+        if self.box_titles[idx] is not attributed_title:
+            self.box_titles[idx] = attributed_title
+            button.getNSButton().setAttributedTitle_(attributed_title)
+            button.getNSButton().setToolTip_(self.metadata.doc(box.script) if box is not None and box.script else None)
+
+    @objc.python_method
+    def box_render(self, box):
+        """Return the cached (attributed title, CGColor) pair for a box's script and color."""
+        import textwrap
+        from AppKit import NSColor, NSAttributedString, NSForegroundColorAttributeName, NSFontAttributeName  # type: ignore
+        script = box.script if box is not None else None
+        title = box.title if box is not None else None
+        color = box.color if box is not None else None
+        missing = script in self.missing_scripts
+        render = self.render_cache.get((script, title, color, missing))
+        if render is None:
+            display_name = title or (os.path.basename(script) if script else "No Script")
+            if missing:
+                display_name = f"Missing: {display_name}"
+            wrapped_name = "\n".join(textwrap.wrap(display_name, width=19))
+            attributed_title = NSAttributedString.alloc().initWithString_attributes_(
+                wrapped_name, {
+                    NSForegroundColorAttributeName: NSColor.whiteColor(),
+                    NSFontAttributeName: bold_font()
+                }
+            )
+            if missing:
+                background_color = NSColor.systemRedColor()
+            elif color:
+                background_color = rgb_to_nscolor(color)
+            else:
+                background_color = NSColor.systemBlueColor() if script else NSColor.systemGrayColor()
+            render = (attributed_title, background_color.CGColor())
+            self.render_cache.set((script, title, color, missing), render)
+        return render
+
     @objc.python_method
     def run_script(self, sender):
-        script_path = self.scripts.get(f"box_{sender.box_index}", None)
+        if sender.box_index is None:
+            return
+        box = self.wall.box(*divmod(sender.box_index, SLOTS))
+        script_path = box.script if box is not None else None
         if script_path:
-            with open(script_path, 'r', encoding='utf-8') as f:
-                script_code = f.read()
-            try:
-                exec(script_code, globals())
-                self.w.close()  # Close the main window after executing the script
+            self.run_path(script_path)
+
+    @objc.python_method
+    def run_path(self, script_path):
+        # Option-click runs the script under cProfile
+        from AppKit import NSEvent, NSEventModifierFlagOption  # type: ignore
+        profile_path = None
+        if NSEvent.modifierFlags() & NSEventModifierFlagOption:
+            name = os.path.splitext(os.path.basename(script_path))[0]
+            profile_path = os.path.join(PROFILE_DIR, f"{name} {time.strftime('%Y-%m-%d %H.%M.%S')}.prof")
+
+        error = self.runner.run(script_path, profile_path=profile_path, warm=script_path in self.wall.warm)
+        self.usage.record(script_path)
+        self.usage.save()  # Written from a background timer
+        if error is None:
+            self.w.close()  # Close the main window after executing the script
+        else:
+            if not os.path.exists(script_path):
+                self.missing_scripts.add(script_path)
+                self.update_subview(self.current_sub_window)
+                self.update_relink_button()
+            elif self.current_sub_window == HOT_PAGE:
+                self.update_subview(HOT_PAGE)
+            Message("Script Error", f"Error: {error}")
+
+    @objc.python_method
+    def update_relink_button(self):
+        self.w.relink_button.show(bool(self.missing_scripts))
+
+    @objc.python_method
+    def relink_missing(self, sender):
+        """Point every box with a missing script at its new location, in one go."""
+        from AppKit import NSOpenPanel, NSFileHandlingPanelOKButton  # type: ignore
+        if self.relocation_index is None:
+            self.relocation_index = RelocationIndex().scan(SCRIPTS_DIR)
+        relinked = self.relink_boxes()
+        if self.missing_scripts:
+            # One folder choice covers every script that is still missing
+            open_panel = NSOpenPanel.openPanel()
+            open_panel.setTitle_("Choose the Folder of the Missing Scripts")
+            open_panel.setCanChooseFiles_(False)
+            open_panel.setCanChooseDirectories_(True)
+            if open_panel.runModal() == NSFileHandlingPanelOKButton:
+                self.relocation_index.scan(open_panel.URL().path())
+                relinked += self.relink_boxes()
+        Message("Relink Scripts", f"Relinked {relinked} boxes, {len(self.missing_scripts)} scripts are still missing.")
+
+    @objc.python_method
+    def relink_boxes(self):
+        relinked = 0
+        still_missing = set()
+        for page, slot, box in list(self.wall.boxes()):
+            if box.script not in self.missing_scripts:
+                continue
+            new_path = self.relocation_index.locate(box.script, box.digest)
+            if new_path is None:
+                still_missing.add(box.script)
+                continue
+            self.script_index.remove(box.script)
+            self.script_index.add(new_path, box.title)
+            self.wall.rename_script(box.script, new_path)
+            self.usage.rename(box.script, new_path)
+            self.wall.set_script(page, slot, new_path, self.relocation_index.digests[new_path], box.title)
+            relinked += 1
+
+        self.missing_scripts = still_missing
+        if relinked:
+            self.update_subview(self.current_sub_window)
+            self.save_wall()
+        self.update_relink_button()
+        return relinked
+
+    @objc.python_method
+    def show_palette(self):
+        """Open the search sheet over the wall; matches come from every page."""
+        import vanilla
+        if self.palette is not None:
+            return
+        self.palette_paths = []
+        self.palette = vanilla.Sheet((420, 260), self.w)
+        self.palette.query = vanilla.EditText((10, 10, -10, 22), "", placeholder="Search scripts on every wall", callback=self.palette_changed)
+        self.palette.matches = vanilla.List((10, 42, -10, -10), [], columnDescriptions=[
+            {"title": "Script", "key": "name", "width": 160},
+            {"title": "Folder", "key": "folder"},
+        ], showColumnTitles=False, allowsMultipleSelection=False, doubleClickCallback=self.palette_run)
+        self.palette.open()
+        self.palette.getNSWindow().makeFirstResponder_(self.palette.query.getNSTextField())
+
+    @objc.python_method
+    def palette_changed(self, sender):
+        self.palette_paths = self.script_index.search(sender.get(), PALETTE_MATCHES)
+        self.palette.matches.set([
+            {"name": os.path.basename(path), "folder": os.path.dirname(path)} for path in self.palette_paths
+        ])
+        if self.palette_paths:
+            self.palette.matches.setSelection([0])
+
+    @objc.python_method
+    def palette_select(self, offset):
+        if self.palette_paths:
+            selection = self.palette.matches.getSelection()
+            row = (selection[0] if selection else 0) + offset
+            self.palette.matches.setSelection([min(max(row, 0), len(self.palette_paths) - 1)])
+
+    @objc.python_method
+    def palette_run(self, sender):
+        selection = self.palette.matches.getSelection()
+        script_path = self.palette_paths[selection[0]] if selection else None
+        self.close_palette()
+        if script_path:
+            self.run_path(script_path)
+
+    @objc.python_method
+    def close_palette(self):
+        if self.palette is not None:
+            self.palette.close()
+            self.palette = None
+
+    @objc.python_method
+    def show_run_report(self, sender):
+        import vanilla
+        rows = []
+        for script, stats in self.run_stats.slowest():
+            rows.append({
+                "path": script,
+                "warm": script in self.wall.warm,
+                "script": os.path.basename(script),
+                "runs": stats.count,
+                "mean": round(stats.mean() * 1000, 1),
+                "p95": round(stats.p95() * 1000, 1),
+                "error": stats.last_error or "",
+            })
+
+        if self.report_window is None:
+            self.report_window = vanilla.Window((560, 300), "Wall Script Runs", minSize=(400, 150))
+            self.report_window.list = vanilla.List((0, 0, -0, -0), [], columnDescriptions=[
+                {"title": "Warm", "key": "warm", "width": 40, "cell": vanilla.CheckBoxListCell(), "editable": True},
+                {"title": "Script", "key": "script", "width": 180},
+                {"title": "Runs", "key": "runs", "width": 50},
+                {"title": "Mean (ms)", "key": "mean", "width": 75},
+                {"title": "p95 (ms)", "key": "p95", "width": 75},
+                {"title": "Last Error", "key": "error"},
+            ], editCallback=self.run_report_edited)
+            self.report_window.list.getNSTableView().setToolTip_("Warm scripts keep their namespace and imports between runs")
+            self.report_window.bind("close", self.run_report_closed)
+        self.report_window.list.set(rows)
+        self.report_window.open()
+
+    @objc.python_method
+    def run_report_edited(self, sender):
+        warm = {row["path"] for row in sender.get() if row["warm"]}
+        shown = {row["path"] for row in sender.get()}
+        for script in (self.wall.warm & shown) - warm:
+            self.runner.cool(script)
+        if warm != self.wall.warm & shown:
+            self.wall.warm = (self.wall.warm - shown) | warm
+            self.save_wall()
 
-            except Exception as e:
-                Message("Script Error", f"Error: {str(e)}")
+    @objc.python_method
+    def run_report_closed(self, sender):
+        self.report_window = None
 
     @objc.python_method
     def change_script(self, sender):
+        from AppKit import NSOpenPanel, NSFileHandlingPanelOKButton  # type: ignore
         open_panel = NSOpenPanel.openPanel()
         open_panel.setTitle_("Choose Script")
         open_panel.setAllowedFileTypes_(["py"])
         if open_panel.runModal() == NSFileHandlingPanelOKButton:
             selected_file = open_panel.URL().path()
-            self.scripts[f"box_{sender.box_index}"] = selected_file
+            page, slot = divmod(sender.box_index, SLOTS)
+            box = self.wall.box(page, slot)
+            old_script = box.script if box is not None else None
+            if old_script:
+                self.script_index.remove(old_script)
+            try:
+                metadata = self.metadata.entries[selected_file] = read_metadata(selected_file)
+            except OSError:
+                metadata = (None, None, None, None)
+            self.wall.set_script(page, slot, selected_file, metadata[1], metadata[2])
+            self.script_index.add(selected_file, metadata[2])
+            if old_script:
+                self.forget_unplaced([old_script])
             self.refresh_button_view(sender.box_index)
-            self.save_scripts()
+            self.save_wall()
 
     @objc.python_method
     def remove_script(self, sender):
-        if f"box_{sender.box_index}" in self.scripts:
-            del self.scripts[f"box_{sender.box_index}"]
+        page, slot = divmod(sender.box_index, SLOTS)
+        box = self.wall.box(page, slot)
+        if box is not None:
+            if box.script:
+                self.script_index.remove(box.script)
+            self.wall.clear(page, slot)
+            if box.script:
+                self.forget_unplaced([box.script])
             self.refresh_button_view(sender.box_index)
-            self.save_scripts()
+            self.save_wall()
 
-        if f"box_{sender.box_index}" in self.button_colors:
-            del self.button_colors[f"box_{sender.box_index}"]
-            self.refresh_button_view(sender.box_index)
-            self.save_colors()
+    @objc.python_method
+    def forget_unplaced(self, scripts):
+        """Drop the launch counts of scripts no box runs any more, so the Hot wall stays full."""
+        located = self.wall.locate_all(scripts)
+        unplaced = [script for script in set(scripts) if script not in located and script in self.usage.scores]
+        if unplaced:
+            self.usage.forget(*unplaced)
+            self.usage.save()
+
+    @objc.python_method
+    def show_macros(self, sender):
+        import vanilla
+        if self.macro_window is None:
+            self.macro_window = vanilla.Window((460, 380), "Wall Script Macros", minSize=(400, 300))
+            self.macro_window.list = vanilla.List((10, 10, -10, -200), [], columnDescriptions=[
+                {"title": "Macro", "key": "name", "width": 120},
+                {"title": "Steps", "key": "steps"},
+            ], allowsMultipleSelection=False, selectionCallback=self.macro_selected, doubleClickCallback=self.run_selected_macro)
+            self.macro_window.status = vanilla.TextEditor((10, -190, -10, 80), "", readOnly=True)
+            self.macro_window.nameLabel = vanilla.TextBox((10, -98, 60, 20), "Name")
+            self.macro_window.name = vanilla.EditText((70, -100, -10, 22), "")
+            self.macro_window.boxesLabel = vanilla.TextBox((10, -68, 60, 20), "Boxes")
+            self.macro_window.boxes = vanilla.EditText((70, -70, -10, 22), "", placeholder="wall.box in order, e.g. 1.1 1.4 3.2")
+            self.macro_window.delete = vanilla.Button((10, -35, 80, 20), "Delete", callback=self.delete_macro)
+            self.macro_window.save = vanilla.Button((-190, -35, 80, 20), "Save", callback=self.save_macro)
+            self.macro_window.run = vanilla.Button((-100, -35, 90, 20), "Run", callback=self.run_selected_macro)
+            self.macro_window.setDefaultButton(self.macro_window.run)
+            self.macro_window.bind("close", self.macros_closed)
+        self.update_macro_list()
+        self.macro_window.open()
+
+    @objc.python_method
+    def update_macro_list(self):
+        self.macro_names = sorted(self.wall.macros)
+        self.macro_window.list.set([
+            {"name": name, "steps": " → ".join(os.path.basename(script) for script in self.wall.macros[name])} for name in self.macro_names
+        ])
+
+    @objc.python_method
+    def selected_macro(self):
+        selection = self.macro_window.list.getSelection()
+        name = self.macro_names[selection[0]] if selection else None
+        # Another Glyphs instance may have removed it since the list was shown
+        return name if name in self.wall.macros else None
+
+    @objc.python_method
+    def macro_selected(self, sender):
+        name = self.selected_macro()
+        if name is None:
+            return
+        boxes = []
+        for script in self.wall.macros[name]:
+            location = self.wall.locate(script)
+            boxes.append(f"{location[0] + 1}.{location[1] + 1}" if location else "?")
+        self.macro_window.name.set(name)
+        self.macro_window.boxes.set(" ".join(boxes))
+
+    @objc.python_method
+    def save_macro(self, sender):
+        name = self.macro_window.name.get().strip()
+        if not name:
+            Message("Macro", "Give the macro a name.")
+            return
+        scripts = []
+        for step in self.macro_window.boxes.get().replace(",", " ").split():
+            try:
+                page, slot = (int(part) - 1 for part in step.split("."))
+                box = self.wall.box(page, slot) if 0 <= page < len(self.wall) and 0 <= slot < SLOTS else None
+            except ValueError:
+                box = None
+            if box is None or not box.script:
+                Message("Macro", f"\"{step}\" is not a box with a script. Write boxes as wall.box, e.g. 2.5 for the fifth box of the second wall.")
+                return
+            scripts.append(box.script)
+        if not scripts:
+            Message("Macro", "Add at least one box.")
+            return
+        self.wall.macros[name] = scripts
+        self.save_wall()
+        self.update_macro_list()
+        self.macro_window.list.setSelection([self.macro_names.index(name)])
+
+    @objc.python_method
+    def delete_macro(self, sender):
+        name = self.selected_macro()
+        if name is not None:
+            del self.wall.macros[name]
+            self.save_wall()
+            self.update_macro_list()
+
+    @objc.python_method
+    def run_selected_macro(self, sender):
+        name = self.selected_macro()
+        if name is not None:
+            self.run_macro(name)
+
+    @objc.python_method
+    def run_macro(self, name):
+        """Run every step of a macro in one namespace and one undo group, then report the timings."""
+        steps = self.runner.run_sequence(self.wall.macros[name], undo_group(Glyphs.font, name))
+        lines = []
+        for number, (script, seconds, error) in enumerate(steps, 1):
+            result = f"failed: {error}" if error is not None else f"{seconds * 1000:.1f} ms"
+            lines.append(f"{number}. {os.path.basename(script)}  {result}")
+        total = sum(seconds for _, seconds, _ in steps)
+        failed = steps[-1][2] is not None
+        if failed:
+            lines.insert(0, f"Stopped after {len(steps)} of {len(self.wall.macros[name])} steps, {total * 1000:.1f} ms.")
+        else:
+            lines.insert(0, f"{name}: {len(steps)} steps, {total * 1000:.1f} ms.")
+        if self.macro_window is not None:
+            self.macro_window.status.set("\n".join(lines))
+        if failed:
+            Message(f"Macro {name}", "\n".join(lines))
+        elif self.w is not None:
+            # The macro window stays open to run the macro again on the next glyphs
+            self.w.close()
+
+    @objc.python_method
+    def macros_closed(self, sender):
+        self.macro_window = None
+
+    @objc.python_method
+    def import_folder(self, sender):
+        """Add every script below a folder to new walls, titled by their MenuTitle."""
+        from AppKit import NSOpenPanel, NSFileHandlingPanelOKButton  # type: ignore
+        open_panel = NSOpenPanel.openPanel()
+        open_panel.setTitle_("Choose a Folder of Scripts")
+        open_panel.setCanChooseFiles_(False)
+        open_panel.setCanChooseDirectories_(True)
+        if open_panel.runModal() == NSFileHandlingPanelOKButton:
+            self.w.titleLabel.set("Importing Scripts…")
+            threading.Thread(target=self.import_scan, args=(open_panel.URL().path(),), daemon=True).start()
+
+    @objc.python_method
+    def import_scan(self, root):
+        from concurrent.futures import ThreadPoolExecutor
+        entries = []
+        error = None
+        try:
+            paths = find_scripts(root)
+            # Glyphs is the interpreter's executable, so worker processes cannot be spawned here
+            with ThreadPoolExecutor() as executor:
+                metadata = self.metadata.scan(paths, executor)
+            entries = [(path, metadata[path][1], metadata[path][2]) for path in paths if path in metadata]
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        finally:
+            # The main thread always hears back, or the title would stay "Importing Scripts…"
+            self.performSelectorOnMainThread_withObject_waitUntilDone_("importFinished:", (entries, error), False)
+
+    def importFinished_(self, result):
+        entries, error = result
+        if error is not None:
+            if self.w is not None:
+                self.w.titleLabel.set("Wall Script")
+            Message("Import Scripts", f"Could not import the folder: {error}")
+            return
+        new_scripts = [(path, digest, title) for path, digest, title in entries if path not in self.script_index]
+        if new_scripts:
+            first_page = self.wall.append_scripts(new_scripts)
+            for path, _, title in new_scripts:
+                self.script_index.add(path, title)
+            self.save_wall()
+            self.bytecode_cache.warm_up([path for path, _, _ in new_scripts])
+        if self.w is not None:
+            self.w.titleLabel.set("Wall Script")
+            if new_scripts:
+                self.current_sub_window = first_page
+            self.update_subview(self.current_sub_window)
+        if not new_scripts:
+            Message("Import Scripts", "Every script in this folder is already on the wall.")
 
     @objc.python_method
     def show_color_picker(self, sender):
-        self.color_window = self.make_color_window(PREDEFINED_COLORS, self.color_selected, sender.box_index)
-        self.color_window.open()
+        self.remember_custom_color()
+        self.color_box_index = sender.box_index
+        if self.color_window is None:
+            self.color_window = self.make_color_window()
+            self.bind_custom_swatches()
+            self.color_window.open()
+            return
+        if self.custom_swatches != self.custom_colors:
+            self.bind_custom_swatches()
+        self.color_window.show()
+
+    @objc.python_method
+    def bind_custom_swatches(self):
+        """Show the saved custom colors after the predefined ones."""
+        for i in range(CUSTOM_COLORS):
+            button = getattr(self.color_window, f"button_{len(PREDEFINED_COLORS) + i}")
+            if i < len(self.custom_colors):
+                button.color = self.custom_colors[i]
+                button.getNSButton().layer().setBackgroundColor_(rgb_to_nscolor(button.color).CGColor())
+                button.show(True)
+            else:
+                button.show(False)
+        self.custom_swatches = list(self.custom_colors)
+
+    @objc.python_method
+    def hide_color_picker(self, sender=None):
+        from AppKit import NSColorPanel  # type: ignore
+        if self.color_window is not None:
+            self.color_window.hide()
+        if self.color_panel_shown:
+            # The color panel is shared by the whole app; give it back untargeted
+            panel = NSColorPanel.sharedColorPanel()
+            panel.setTarget_(None)
+            panel.setAction_(None)
+            panel.orderOut_(None)
+            self.color_panel_shown = False
+        self.remember_custom_color()
+        return False
 
     @objc.python_method
     def color_selected(self, sender):
-        print("__sender", sender)
-        selected_color = sender.color
-        color_rgb = nscolor_to_rgb(selected_color)
-        self.button_colors[f"box_{sender.box_index}"] = color_rgb
-        self.refresh_button_view(sender.box_index)
-        self.save_colors()
+        self.set_box_color(self.color_box_index, tuple(sender.color))
+        self.hide_color_picker()
 
-        self.color_window.close()
-        self.color_window = None
+    @objc.python_method
+    def set_box_color(self, box_index, color_rgb):
+        self.wall.set_color(*divmod(box_index, SLOTS), color_rgb)
+        self.refresh_button_view(box_index)
+        self.save_wall()
 
     @objc.python_method
-    def refresh_button_view(self, box_index):
-        script_name = self.scripts.get(f"box_{box_index}", "No Script")
-        display_name = os.path.basename(script_name) if script_name != "No Script" else script_name
-        wrapped_name = "\n".join(textwrap.wrap(display_name, width=19))
+    def show_color_panel(self, sender):
+        from AppKit import NSColorPanel  # type: ignore
+        panel = NSColorPanel.sharedColorPanel()
+        panel.setTarget_(self)
+        panel.setAction_("colorPanelChanged:")
+        panel.setShowsAlpha_(True)
+        panel.orderFront_(None)
+        self.color_panel_shown = True
+
+    def colorPanelChanged_(self, panel):
+        # The box follows the panel live; the color is kept once the picker is done with it
+        if self.w is None or not self.color_panel_shown:
+            return
+        self.custom_color = nscolor_to_rgb(panel.color())
+        self.set_box_color(self.color_box_index, self.custom_color)
 
-        saved_color_rgb = self.button_colors.get(f"box_{box_index}", None)
-        if saved_color_rgb:
-            color = rgb_to_nscolor(saved_color_rgb)
-        else:
-            gray_color = NSColor.systemGrayColor()
-            blue_color = NSColor.systemBlueColor()
-            color = gray_color if script_name == "No Script" else blue_color
+    @objc.python_method
+    def remember_custom_color(self):
+        """Put the last color chosen in the color panel first among the custom colors."""
+        if self.custom_color is None:
+            return
+        color = [round(component, 4) for component in self.custom_color]
+        self.custom_color = None
+        self.custom_colors = ([color] + [other for other in self.custom_colors if other != color])[:CUSTOM_COLORS]
+        Glyphs.defaults[f"{DEFAULTS_PREFIX}.customColors"] = self.custom_colors
 
-        button = getattr(self.w.subview, f"button_{box_index % (COLS * ROWS)}")
-        button_layer = button.getNSButton().layer()
-        button_layer.setBackgroundColor_(color.CGColor())
+    @objc.python_method
+    def refresh_button_view(self, box_index):
+        if self.current_sub_window == HOT_PAGE:
+            if box_index in self.hot_boxes:
+                self.bind_box(self.hot_boxes.index(box_index), box_index)
+            return
+        idx = box_index - self.current_sub_window * SLOTS
+        if 0 <= idx < SLOTS:
+            self.bind_box(idx, box_index)
 
-        attributed_title = NSAttributedString.alloc().initWithString_attributes_(
-            wrapped_name, {
-                NSForegroundColorAttributeName: NSColor.whiteColor(),
-                NSFontAttributeName: FONT_BOLD
-            }
-        )
-        button.getNSButton().setAttributedTitle_(attributed_title)
+    @objc.python_method
+    def go_to_page(self, index):
+        if 0 <= index < len(self.wall) and index != self.current_sub_window:
+            self.current_sub_window = index
+            self.update_subview(self.current_sub_window)
 
     @objc.python_method
     def navigate_right(self, sender):
-        if self.current_sub_window < self.total_sub_windows - 1:
+        if self.current_sub_window < len(self.wall) - 1:
             self.current_sub_window += 1
             self.update_subview(self.current_sub_window)
 
     @objc.python_method
     def navigate_left(self, sender):
-        if self.current_sub_window > 0:
+        if self.current_sub_window > HOT_PAGE:
             self.current_sub_window -= 1
             self.update_subview(self.current_sub_window)
 
     @objc.python_method
     def add_page(self, sender):
-        self.total_sub_windows += 1
-        self.current_sub_window = self.total_sub_windows - 1
+        if self.current_sub_window == HOT_PAGE:
+            return
+        self.current_sub_window += 1
+        self.wall.insert_page(self.current_sub_window)
         self.update_subview(self.current_sub_window)
-        self.save_total_sub_windows()
+        self.save_wall()
 
     @objc.python_method
     def delete_page(self, sender):
-        if self.total_sub_windows > 1:
-            self.total_sub_windows -= 1
-            self.current_sub_window = min(self.current_sub_window, self.total_sub_windows - 1)
+        if len(self.wall) > 1 and self.current_sub_window != HOT_PAGE:
+            scripts = [box.script for box in self.wall.page(self.current_sub_window).values() if box.script]
+            for script in scripts:
+                self.script_index.remove(script)
+            self.wall.delete_page(self.current_sub_window)
+            self.forget_unplaced(scripts)
+            self.current_sub_window = min(self.current_sub_window, len(self.wall) - 1)
             self.update_subview(self.current_sub_window)
-            self.save_total_sub_windows()
-
-    @objc.python_method
-    def save_total_sub_windows(self):
-        with open(SCRIPT_FILE, 'r+', encoding='utf-8') as file:
-            lines = file.readlines()
-            file.seek(0)
-            file.write(f"TOTAL_SUB_WINDOWS={self.total_sub_windows}\n")
-            file.writelines(lines[1:])  # write the remaining lines
-
-    @objc.python_method
-    def load_scripts(self):
-        if os.path.exists(SCRIPT_FILE):
-            with open(SCRIPT_FILE, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
-                for line in lines[1:]:  # Skip the first line which is TOTAL_SUB_WINDOWS
-                    if '=' in line:
-                        key, value = line.strip().split('=', 1)
-                        if key.startswith("box_"):
-                            self.scripts[key] = value
-        else:
-            self.scripts = {}
+            self.save_wall()
+
+    @objc.python_method
+    def move_page(self, offset):
+        destination = self.current_sub_window + offset
+        if self.current_sub_window != HOT_PAGE and 0 <= destination < len(self.wall):
+            self.wall.move_page(self.current_sub_window, destination)
+            self.current_sub_window = destination
+            self.update_subview(self.current_sub_window)
+            self.save_wall()
+
+    @objc.python_method
+    def load_wall(self):
+        data = self.store.load()
+        self.wall = Wall.from_data(data)
+        self.script_index = ScriptIndex.from_wall(self.wall)
+        if data.get("version", 1) < STORE_VERSION:
+            # Merges need a document in the current layout to compare against
+            self.save_wall()
 
     @objc.python_method
-    def save_scripts(self):
-        with open(SCRIPT_FILE, 'w', encoding='utf-8') as file:
-            file.write(f"TOTAL_SUB_WINDOWS={self.total_sub_windows}\n")
-            for key, value in self.scripts.items():
-                file.write(f"{key}={value}\n")
+    def save_wall(self):
+        self.store.save(self.wall.to_data())
 
     @objc.python_method
-    def load_colors(self):
-        if os.path.exists(COLOR_FILE):
-            with open(COLOR_FILE, 'r', encoding='utf-8') as file:
-                self.button_colors = json.load(file)
+    def store_conflict(self):
+        """Called from the save timer when another instance saved first."""
+        self.performSelectorOnMainThread_withObject_waitUntilDone_("storeChanged:", None, False)
+
+    def storeChanged_(self, sender):
+        self.merge_store()
+
+    def pollStore_(self, timer):
+        self.merge_store()
+
+    @objc.python_method
+    def merge_store(self):
+        """Fold edits saved by another Glyphs instance into the live wall."""
+        data = self.store.poll()
+        if data is None:
+            return
+        page_count = len(self.wall)
+        macros = {name: list(scripts) for name, scripts in self.wall.macros.items()}
+        changes = self.wall.merge(self.store.base, data)
+        self.store.accept(data)
+        for page, slot, old_box in changes:
+            if old_box is not None and old_box.script:
+                self.script_index.remove(old_box.script)
+            box = self.wall.box(page, slot) if page < len(self.wall) else None
+            if box is not None and box.script:
+                self.script_index.add(box.script, box.title)
+        self.forget_unplaced([old_box.script for _, _, old_box in changes if old_box is not None and old_box.script])
+        # Local edits that are not in the merged document still need saving
+        merged = self.wall.to_data()
+        if merged != {key: data.get(key) for key in merged}:
+            self.save_wall()
+        if self.macro_window is not None and self.wall.macros != macros:
+            selected = self.macro_window.list.getSelection()
+            selected = self.macro_names[selected[0]] if selected else None
+            self.update_macro_list()
+            if selected in self.macro_names:
+                self.macro_window.list.setSelection([self.macro_names.index(selected)])
+        if self.w is None:
+            return
+        if len(self.wall) != page_count:
+            self.current_sub_window = min(self.current_sub_window, len(self.wall) - 1)
+            self.update_subview(self.current_sub_window)
         else:
-            self.button_colors = {}
+            for page, slot, _ in changes:
+                self.refresh_button_view(page * SLOTS + slot)
 
     @objc.python_method
-    def save_colors(self):
-        with open(COLOR_FILE, 'w', encoding='utf-8') as file:
-            json.dump(self.button_colors, file, indent=2)
+    def load_keymap(self):
+        """Read the launch keys from the defaults, falling back to the built-in map."""
+        slot_keys = Glyphs.defaults[f"{DEFAULTS_PREFIX}.slotKeys"] or DEFAULT_SLOT_KEYS
+        page_modifier = Glyphs.defaults[f"{DEFAULTS_PREFIX}.pageModifier"] or DEFAULT_PAGE_MODIFIER
+        try:
+            return KeyMap(str(slot_keys), str(page_modifier))
+        except ValueError as e:
+            print(f"Wall Script: {e}; using the default keys")
+            return KeyMap()
 
     @objc.python_method
     def add_key_event_monitor(self):
+        from AppKit import NSEvent, NSEventMaskKeyDown  # type: ignore
         self.key_event_monitor = NSEvent.addLocalMonitorForEventsMatchingMask_handler_(NSEventMaskKeyDown, self.handle_key_event)
 
     @objc.python_method
     def handle_key_event(self, event):
+        from AppKit import NSEventModifierFlagCommand  # type: ignore
         key_code = event.keyCode()
-
-        if key_code == 123:  # Left arrow key
+        command_down = event.modifierFlags() & NSEventModifierFlagCommand
+
+        if self.palette is not None:
+            if not self.palette.getNSWindow().isKeyWindow():
+                return event
+            if key_code in (36, 76):  # Return or Enter runs the selected match
+                self.palette_run(None)
+                return None
+            elif key_code == 53:  # Escape closes the palette
+                self.close_palette()
+                return None
+            elif key_code in (125, 126):  # Down and up arrows move through the matches
+                self.palette_select(1 if key_code == 125 else -1)
+                return None
+            return event  # Everything else goes to the search field
+
+        # Search, box, page, arrow and Escape keys only apply while the wall is the key window,
+        # so they never reach Glyphs' own views or the macro window's text fields
+        if not self.w.getNSWindow().isKeyWindow():
+            return event
+
+        if key_code == 3 and command_down:  # Cmd + F opens the search palette
+            self.show_palette()
+            return None
+
+        action = self.keymap.dispatch(key_code, event.modifierFlags())
+        if action is not None:
+            kind, index = action
+            if kind == "page":
+                self.go_to_page(index)
+            else:
+                self.run_script(getattr(self.w.subview, f"button_{index}"))
+            return None
+        elif key_code == 123 and command_down:  # Cmd + left arrow moves the page left
+            self.move_page(-1)
+            return None
+        elif key_code == 124 and command_down:  # Cmd + right arrow moves the page right
+            self.move_page(1)
+            return None
+        elif key_code == 123:  # Left arrow key
             self.navigate_left(None)
             return None  # Prevent system beep
         elif key_code == 124:  # Right arrow key
@@ -451,9 +1132,16 @@ class WallScript(GeneralPlugin):
 
     @objc.python_method
     def remove_key_event_monitor(self, sender):
+        from AppKit import NSEvent  # type: ignore
         if self.key_event_monitor:
             NSEvent.removeMonitor_(self.key_event_monitor)
             self.key_event_monitor = None
+        self.palette = None
+        self.hide_color_picker()
+        if self.store_timer is not None:
+            self.store_timer.invalidate()
+            self.store_timer = None
+        self.store.flush()
         self.w = None
 
     @objc.python_method
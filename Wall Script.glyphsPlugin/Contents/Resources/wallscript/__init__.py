@@ -0,0 +1,20 @@
+# encoding: utf-8
+
+"""Wall Script core: the wall model, its store and the script engine.
+
+Nothing in this package imports GlyphsApp, AppKit or vanilla, so it can be
+used and benchmarked outside Glyphs. Modules that only some features need
+(json, tempfile, concurrent.futures, cProfile, ast) are imported where they are
+used, so importing the package stays cheap for Glyphs launches that never
+open the wall.
+"""
+
+from .model import TOTAL_SUB_WINDOWS, ROWS, COLS, SLOTS, STORE_VERSION, Box, Wall
+from .store import SAVE_DELAY, WallStore
+from .cache import WARM_UP_WORKERS, LRUCache, BytecodeCache, CodeCache
+from .engine import STATS_WINDOW, ScriptStats, RunStats, ScriptRunner
+from .search import ScriptIndex
+from .integrity import file_digest, check_scripts, RelocationIndex
+from .metadata import read_metadata, find_scripts, MetadataCache
+from .keymap import DEFAULT_SLOT_KEYS, DEFAULT_PAGE_MODIFIER, KeyMap
+from .usage import HALF_LIFE, USAGE_SAVE_DELAY, UsageCounter
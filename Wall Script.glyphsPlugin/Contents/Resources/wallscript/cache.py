@@ -0,0 +1,126 @@
+# encoding: utf-8
+
+"""In-memory and on-disk caches of compiled script code."""
+
+import os
+import marshal
+import hashlib
+from collections import OrderedDict
+from importlib.util import MAGIC_NUMBER
+
+
+WARM_UP_WORKERS = 4
+
+
+class LRUCache(object):
+    """Small bounded mapping that drops the least recently used entry."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def summary(self):
+        return f"{self.hits} hits, {self.misses} misses, {len(self._data)}/{self.maxsize} entries"
+
+
+class BytecodeCache(object):
+    """Marshalled code objects on disk, one file per script, validated by a hash of its source."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def entry_path(self, path):
+        return os.path.join(self.directory, hashlib.sha1(path.encode('utf-8')).hexdigest() + ".marshal")
+
+    def code_for(self, path, source):
+        digest = hashlib.sha1(source).digest()
+        entry_path = self.entry_path(path)
+        try:
+            with open(entry_path, 'rb') as file:
+                magic, cached_digest, code = marshal.load(file)
+            if magic == MAGIC_NUMBER and cached_digest == digest:
+                return code
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+        code = compile(source, path, 'exec')
+        self.write(entry_path, digest, code)
+        return code
+
+    def write(self, entry_path, digest, code):
+        try:
+            import tempfile
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+            with os.fdopen(fd, 'wb') as file:
+                marshal.dump((MAGIC_NUMBER, digest, code), file)
+            os.replace(temp_path, entry_path)
+        except OSError:
+            pass  # The cache is only an optimization
+
+    def warm(self, path):
+        """Compile path into the cache unless an up-to-date entry exists."""
+        try:
+            with open(path, 'rb') as file:
+                self.code_for(path, file.read())
+        except (OSError, SyntaxError, ValueError):
+            pass  # Broken scripts report their error when they are run
+
+    def warm_up(self, paths, workers=WARM_UP_WORKERS):
+        """Warm every path on a thread pool without waiting for it to finish."""
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(max_workers=workers)
+        for path in paths:
+            executor.submit(self.warm, path)
+        executor.shutdown(wait=False)
+
+
+class CodeCache(LRUCache):
+    """Compiled script code keyed by path, revalidated against the file's mtime and size."""
+
+    def __init__(self, maxsize, bytecode_cache=None):
+        super().__init__(maxsize)
+        self.bytecode_cache = bytecode_cache
+
+    def code_for(self, path):
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        entry = self._data.get(path)
+        if entry is not None and entry[0] == stamp:
+            self._data.move_to_end(path)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        with open(path, 'rb') as f:
+            source = f.read()
+        if self.bytecode_cache is not None:
+            code = self.bytecode_cache.code_for(path, source)
+        else:
+            code = compile(source, path, 'exec')
+        self.set(path, (stamp, code))
+        return code
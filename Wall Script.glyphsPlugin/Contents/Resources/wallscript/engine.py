@@ -0,0 +1,163 @@
+# encoding: utf-8
+
+"""Running wall scripts and keeping their timing statistics."""
+
+import os
+import time
+import builtins
+import importlib
+from contextlib import nullcontext
+from collections import deque
+
+
+STATS_WINDOW = 100
+
+# Imported once and bound in every script namespace; the star modules'
+# public names are bound as well, like `from GlyphsApp import *`
+BASE_MODULES = ("GlyphsApp", "vanilla", "AppKit", "Foundation")
+STAR_MODULES = ("GlyphsApp",)
+
+
+class ScriptStats(object):
+    """Run count, last error and the durations of the latest STATS_WINDOW runs of one script."""
+
+    __slots__ = ("count", "durations", "last_error")
+
+    def __init__(self):
+        self.count = 0
+        self.durations = deque(maxlen=STATS_WINDOW)
+        self.last_error = None
+
+    def record(self, duration, error=None):
+        self.count += 1
+        self.durations.append(duration)
+        if error is not None:
+            self.last_error = error
+
+    def mean(self):
+        return sum(self.durations) / len(self.durations) if self.durations else 0.0
+
+    def p95(self):
+        if not self.durations:
+            return 0.0
+        durations = sorted(self.durations)
+        return durations[max(0, -(-len(durations) * 95 // 100) - 1)]
+
+
+class RunStats(object):
+    """Rolling ScriptStats for every script run from the wall, keyed by script path."""
+
+    def __init__(self):
+        self._stats = {}
+
+    def record(self, script, duration, error=None):
+        stats = self._stats.get(script)
+        if stats is None:
+            stats = self._stats[script] = ScriptStats()
+        stats.record(duration, error)
+
+    def get(self, script):
+        return self._stats.get(script)
+
+    def slowest(self, limit=None):
+        return sorted(self._stats.items(), key=lambda item: item[1].mean(), reverse=True)[:limit]
+
+
+class ScriptRunner(object):
+    """Runs scripts compiled by a CodeCache and records every run in RunStats.
+
+    Each run gets a fresh namespace copied from a base namespace that is
+    built once. Warm scripts keep their namespace between runs instead.
+    """
+
+    def __init__(self, code_cache, run_stats=None, base_modules=BASE_MODULES, star_modules=STAR_MODULES):
+        self.code_cache = code_cache
+        self.run_stats = run_stats if run_stats is not None else RunStats()
+        self.base_modules = base_modules
+        self.star_modules = star_modules
+        self.warm_namespaces = {}
+        self._base_namespace = None
+
+    def base_namespace(self):
+        if self._base_namespace is None:
+            namespace = {"__builtins__": builtins}
+            for name in self.base_modules:
+                try:
+                    module = importlib.import_module(name)
+                except ImportError:
+                    continue  # Not available outside Glyphs
+                namespace[name] = module
+                if name in self.star_modules:
+                    public = getattr(module, "__all__", None) or [attr for attr in dir(module) if not attr.startswith("_")]
+                    for attr in public:
+                        if hasattr(module, attr):
+                            namespace[attr] = getattr(module, attr)
+            self._base_namespace = namespace
+        return self._base_namespace
+
+    def namespace_for(self, path, warm=False):
+        if warm:
+            namespace = self.warm_namespaces.get(path)
+            if namespace is not None:
+                return namespace
+        namespace = dict(self.base_namespace())
+        namespace["__name__"] = "__main__"
+        namespace["__file__"] = path
+        if warm:
+            self.warm_namespaces[path] = namespace
+        return namespace
+
+    def cool(self, path):
+        """Forget the kept namespace of path."""
+        self.warm_namespaces.pop(path, None)
+
+    def run(self, path, namespace=None, profile_path=None, warm=False):
+        """Run the script at path and return its error message, or None.
+
+        Without an explicit namespace the script runs in its own one, kept
+        for the next run when warm is set. With profile_path the run is
+        captured with cProfile and saved there.
+        """
+        error = None
+        start = time.perf_counter()
+        try:
+            if namespace is None:
+                namespace = self.namespace_for(path, warm)
+            code = self.code_cache.code_for(path)
+            if profile_path:
+                self.profile(code, namespace, profile_path)
+            else:
+                exec(code, namespace)
+        except Exception as e:
+            error = str(e)
+        self.run_stats.record(path, time.perf_counter() - start, error)
+        return error
+
+    def run_sequence(self, paths, group=None):
+        """Run paths in order in one shared namespace, stopping at the first failure.
+
+        group is an optional context manager around the whole sequence, such
+        as an undo group. Returns a (path, seconds, error) tuple per step run.
+        """
+        namespace = self.namespace_for(None)
+        steps = []
+        with group if group is not None else nullcontext():
+            for path in paths:
+                namespace["__file__"] = path
+                start = time.perf_counter()
+                error = self.run(path, namespace)
+                steps.append((path, time.perf_counter() - start, error))
+                if error is not None:
+                    break
+        return steps
+
+    def profile(self, code, namespace, profile_path):
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            exec(code, namespace)
+        finally:
+            profiler.disable()
+            os.makedirs(os.path.dirname(profile_path), exist_ok=True)
+            profiler.dump_stats(profile_path)
@@ -0,0 +1,90 @@
+# encoding: utf-8
+
+"""Finding scripts that went missing from the wall, and where they went."""
+
+import os
+import hashlib
+from collections import defaultdict
+
+
+def file_digest(path):
+    with open(path, 'rb') as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def check_scripts(scripts):
+    """Stat every (path, digest) pair once.
+
+    Returns the set of missing paths and the digests of existing scripts
+    that did not have one yet.
+    """
+    missing = set()
+    digests = {}
+    for path, digest in scripts:
+        if path in missing or path in digests:
+            continue
+        try:
+            if not os.path.isfile(path):
+                missing.add(path)
+            elif digest is None:
+                digests[path] = file_digest(path)
+        except OSError:
+            missing.add(path)
+    return missing, digests
+
+
+def shared_suffix(path, other):
+    """Number of trailing path components the two paths have in common."""
+    count = 0
+    for part, other_part in zip(reversed(path.split(os.sep)), reversed(other.split(os.sep))):
+        if part != other_part:
+            break
+        count += 1
+    return count
+
+
+class RelocationIndex(object):
+    """Every .py file below some folders, by basename and by content digest."""
+
+    def __init__(self):
+        self.by_name = defaultdict(list)
+        self.by_digest = {}
+        self.digests = {}
+
+    def __len__(self):
+        return len(self.digests)
+
+    def scan(self, root):
+        for directory, folders, files in os.walk(root):
+            folders[:] = [folder for folder in folders if not folder.startswith(".")]
+            for name in files:
+                if name.endswith(".py"):
+                    self.add(os.path.join(directory, name))
+        return self
+
+    def add(self, path):
+        if path in self.digests:
+            return
+        try:
+            digest = file_digest(path)
+        except OSError:
+            return
+        self.digests[path] = digest
+        self.by_name[os.path.basename(path)].append(path)
+        self.by_digest.setdefault(digest, path)
+
+    def locate(self, path, digest=None):
+        """Return the new location of a missing script, or None if it is not found or ambiguous.
+
+        A file with the same contents wins; otherwise a file with the same name,
+        preferring the one whose folders match the old path the most.
+        """
+        if digest is not None and digest in self.by_digest:
+            return self.by_digest[digest]
+        candidates = self.by_name.get(os.path.basename(path), [])
+        if len(candidates) == 1:
+            return candidates[0]
+        ranked = sorted(((shared_suffix(path, candidate), candidate) for candidate in candidates), reverse=True)
+        if ranked and ranked[0][0] > (ranked[1][0] if len(ranked) > 1 else 0):
+            return ranked[0][1]
+        return None
@@ -0,0 +1,63 @@
+# encoding: utf-8
+
+"""Keyboard launch map: which key runs which box, and which jumps to a page."""
+
+from .model import SLOTS
+
+
+# macOS virtual key codes of the ANSI layout
+KEY_CODES = {
+    "a": 0, "s": 1, "d": 2, "f": 3, "h": 4, "g": 5, "z": 6, "x": 7, "c": 8, "v": 9,
+    "b": 11, "q": 12, "w": 13, "e": 14, "r": 15, "y": 16, "t": 17,
+    "1": 18, "2": 19, "3": 20, "4": 21, "6": 22, "5": 23, "=": 24, "9": 25, "7": 26,
+    "-": 27, "8": 28, "0": 29, "]": 30, "o": 31, "u": 32, "[": 33, "i": 34, "p": 35,
+    "l": 37, "j": 38, "'": 39, "k": 40, ";": 41, "\\": 42, ",": 43, "/": 44, "n": 45,
+    "m": 46, ".": 47,
+}
+
+# NSEventModifierFlags values
+MODIFIER_FLAGS = {
+    "shift": 1 << 17,
+    "control": 1 << 18,
+    "option": 1 << 19,
+    "command": 1 << 20,
+}
+LAUNCH_MODIFIERS = MODIFIER_FLAGS["control"] | MODIFIER_FLAGS["option"] | MODIFIER_FLAGS["command"]
+
+# One key per box, row by row: 1-4, Q-R, A-F, Z-V
+DEFAULT_SLOT_KEYS = "1234qwerasdfzxcv"
+DEFAULT_PAGE_MODIFIER = "control"
+
+
+class KeyMap(object):
+    """Precomputed key code -> slot and key code -> page tables.
+
+    Plain slot keys run the box in that slot of the current page; the page
+    modifier plus a digit jumps to page 1-9, and 0 to page 10.
+    """
+
+    __slots__ = ("slot_keys", "page_modifier", "slots", "pages", "page_flag")
+
+    def __init__(self, slot_keys=DEFAULT_SLOT_KEYS, page_modifier=DEFAULT_PAGE_MODIFIER):
+        slot_keys = slot_keys.lower()
+        unknown = [key for key in slot_keys if key not in KEY_CODES]
+        if unknown or len(slot_keys) != SLOTS or len(set(slot_keys)) != SLOTS:
+            raise ValueError(f"slot keys must be {SLOTS} different keys from the ANSI layout, got {slot_keys!r}")
+        if page_modifier not in MODIFIER_FLAGS:
+            raise ValueError(f"page modifier must be one of {', '.join(MODIFIER_FLAGS)}, got {page_modifier!r}")
+
+        self.slot_keys = slot_keys
+        self.page_modifier = page_modifier
+        self.slots = {KEY_CODES[key]: slot for slot, key in enumerate(slot_keys)}
+        self.pages = {KEY_CODES[str(digit)]: (digit or 10) - 1 for digit in range(10)}
+        self.page_flag = MODIFIER_FLAGS[page_modifier]
+
+    def dispatch(self, key_code, modifier_flags):
+        """Return ("page", index), ("slot", index) or None for a key press."""
+        if modifier_flags & self.page_flag:
+            page = self.pages.get(key_code)
+            return ("page", page) if page is not None else None
+        if not modifier_flags & LAUNCH_MODIFIERS:
+            slot = self.slots.get(key_code)
+            return ("slot", slot) if slot is not None else None
+        return None
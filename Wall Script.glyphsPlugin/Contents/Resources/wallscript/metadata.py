@@ -0,0 +1,104 @@
+# encoding: utf-8
+
+"""Reading script metadata (MenuTitle and docstring) without running the scripts."""
+
+import os
+import re
+import hashlib
+
+from .store import write_json_atomic
+
+
+MENU_TITLE = re.compile(r"^#\s*MenuTitle\s*:\s*(.+?)\s*$", re.M)
+
+
+def read_metadata(path):
+    """Return (mtime_ns, digest, menu title, docstring) of the script at path.
+
+    The source is only parsed with ast, never executed. Scripts that do not
+    parse still get their MenuTitle.
+    """
+    import ast
+    mtime = os.stat(path).st_mtime_ns
+    with open(path, 'rb') as file:
+        source = file.read()
+    match = MENU_TITLE.search(source.decode('utf-8', errors='replace'))
+    try:
+        doc = ast.get_docstring(ast.parse(source))
+    except (SyntaxError, ValueError):
+        doc = None
+    return mtime, hashlib.sha1(source).hexdigest(), match.group(1) if match else None, doc
+
+
+def find_scripts(root):
+    """Every .py script below root, skipping hidden folders and private modules, sorted by path."""
+    found = []
+    for directory, folders, files in os.walk(root):
+        folders[:] = sorted(folder for folder in folders if not folder.startswith((".", "_")))
+        for name in sorted(files):
+            if name.endswith(".py") and not name.startswith((".", "_")):
+                found.append(os.path.join(directory, name))
+    return found
+
+
+class MetadataCache(object):
+    """read_metadata results by path, reused while the file's mtime is unchanged."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            import json
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    self.entries = {key: tuple(value) for key, value in json.load(file).items()}
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def get(self, path):
+        return self.entries.get(path)
+
+    def doc(self, path):
+        entry = self.entries.get(path)
+        return entry[3] if entry else None
+
+    def scan(self, paths, executor=None):
+        """Return {path: metadata} for paths, reading only new or modified files.
+
+        Stale files are read on executor, a process pool unless another
+        executor is given. Unreadable files are left out.
+        """
+        results = {}
+        stale = []
+        for path in paths:
+            entry = self.entries.get(path)
+            try:
+                fresh = entry is not None and entry[0] == os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if fresh:
+                results[path] = entry
+            else:
+                stale.append(path)
+
+        if stale:
+            own_executor = executor is None
+            if own_executor:
+                from concurrent.futures import ProcessPoolExecutor
+                executor = ProcessPoolExecutor()
+            try:
+                futures = [(path, executor.submit(read_metadata, path)) for path in stale]
+                for path, future in futures:
+                    try:
+                        results[path] = self.entries[path] = future.result()
+                    except OSError:
+                        pass
+            finally:
+                if own_executor:
+                    executor.shutdown()
+            if self.path:
+                try:
+                    write_json_atomic(self.path, dict(self.entries), indent=None)
+                except OSError:
+                    pass  # The cache file is only an optimization
+        return results
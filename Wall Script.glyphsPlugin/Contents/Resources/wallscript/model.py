@@ -0,0 +1,246 @@
+# encoding: utf-8
+
+"""The wall: ordered pages of ROWS x COLS boxes."""
+
+
+TOTAL_SUB_WINDOWS = 4
+ROWS = 4
+COLS = 4
+SLOTS = ROWS * COLS
+STORE_VERSION = 2
+
+
+class Box(object):
+    """A single assigned box: the script path and/or a custom RGBA color.
+
+    digest is the SHA-1 of the script's contents, used to find it again
+    after it was moved; title is its MenuTitle, when known.
+    """
+
+    __slots__ = ("script", "color", "digest", "title")
+
+    def __init__(self, script=None, color=None, digest=None, title=None):
+        self.script = script
+        self.color = color
+        self.digest = digest
+        self.title = title
+
+    def is_empty(self):
+        return self.script is None and self.color is None
+
+    def to_data(self):
+        data = {}
+        if self.script is not None:
+            data["script"] = self.script
+        if self.color is not None:
+            data["color"] = list(self.color)
+        if self.digest is not None:
+            data["digest"] = self.digest
+        if self.title is not None:
+            data["title"] = self.title
+        return data
+
+    @classmethod
+    def from_data(cls, data):
+        color = data.get("color")
+        return cls(data.get("script"), tuple(color) if color else None, data.get("digest"), data.get("title"))
+
+
+class Wall(object):
+    """Ordered pages of SLOTS boxes each.
+
+    A page is a dict of slot -> Box holding only assigned boxes, or None when
+    the page is empty, so memory follows the number of assigned boxes.
+    warm is the set of script paths whose namespace is kept between runs,
+    and macros maps a macro name to the script paths it runs in order.
+    """
+
+    __slots__ = ("pages", "warm", "macros")
+
+    def __init__(self, page_count=TOTAL_SUB_WINDOWS):
+        self.pages = [None] * max(page_count, 1)
+        self.warm = set()
+        self.macros = {}
+
+    def __len__(self):
+        return len(self.pages)
+
+    def page(self, page):
+        """The slot -> Box dict of a page; empty pages give an empty dict."""
+        return self.pages[page] or {}
+
+    def box(self, page, slot):
+        boxes = self.pages[page]
+        return boxes.get(slot) if boxes else None
+
+    def ensure_box(self, page, slot):
+        boxes = self.pages[page]
+        if boxes is None:
+            boxes = self.pages[page] = {}
+        box = boxes.get(slot)
+        if box is None:
+            box = boxes[slot] = Box()
+        return box
+
+    def set_script(self, page, slot, script, digest=None, title=None):
+        box = self.ensure_box(page, slot)
+        box.script = script
+        box.digest = digest
+        box.title = title
+
+    def set_color(self, page, slot, color):
+        self.ensure_box(page, slot).color = tuple(color)
+
+    def clear(self, page, slot):
+        boxes = self.pages[page]
+        if boxes and boxes.pop(slot, None) is not None and not boxes:
+            self.pages[page] = None
+
+    def boxes(self):
+        """Yield (page, slot, box) for every assigned box."""
+        for page, boxes in enumerate(self.pages):
+            if boxes:
+                for slot, box in boxes.items():
+                    yield page, slot, box
+
+    def append_scripts(self, scripts):
+        """Fill pages after the last assigned box with (script, digest, title) entries.
+
+        Empty pages at the end are reused. Returns the index of the first filled page.
+        """
+        first_page = len(self.pages)
+        while first_page and not self.pages[first_page - 1]:
+            first_page -= 1
+        for index, (script, digest, title) in enumerate(scripts):
+            page, slot = divmod(index, SLOTS)
+            page += first_page
+            if page == len(self.pages):
+                self.pages.append(None)
+            self.set_script(page, slot, script, digest, title)
+        return first_page
+
+    def locate(self, script):
+        """(page, slot) of the first box running script, or None."""
+        for page, slot, box in self.boxes():
+            if box.script == script:
+                return page, slot
+        return None
+
+    def locate_all(self, scripts):
+        """{script: (page, slot)} of the first box running each of scripts, in one pass."""
+        wanted = set(scripts)
+        found = {}
+        for page, slot, box in self.boxes():
+            if box.script in wanted and box.script not in found:
+                found[box.script] = page, slot
+                if len(found) == len(wanted):
+                    break
+        return found
+
+    def rename_script(self, old, new):
+        """Point the warm set and the macros at a script's new path."""
+        if old in self.warm:
+            self.warm.discard(old)
+            self.warm.add(new)
+        for scripts in self.macros.values():
+            scripts[:] = [new if script == old else script for script in scripts]
+
+    def merge(self, base, remote):
+        """Apply the edits from document base to document remote to this wall.
+
+        A box, the warm set or the macros only take the remote value when they
+        are unchanged here since base, so local edits win over remote ones.
+        Pages are matched by index; the page count follows remote unless pages
+        were added or removed here too. Returns the (page, slot, old_box) of
+        every box that changed.
+        """
+        base_pages = base.get("pages") or [{}]
+        remote_pages = remote.get("pages") or [{}]
+        changes = []
+        if len(remote_pages) != len(base_pages) and len(self.pages) == len(base_pages):
+            for page in range(len(remote_pages), len(self.pages)):
+                changes.extend((page, slot, box) for slot, box in (self.pages[page] or {}).items())
+            del self.pages[len(remote_pages):]
+            self.pages.extend([None] * (len(remote_pages) - len(self.pages)))
+        for page in range(min(len(self.pages), len(remote_pages))):
+            base_boxes = base_pages[page] if page < len(base_pages) else {}
+            remote_boxes = remote_pages[page]
+            for key in set(base_boxes) | set(remote_boxes):
+                base_box = base_boxes.get(key, {})
+                remote_box = remote_boxes.get(key, {})
+                slot = int(key)
+                local = self.box(page, slot)
+                if remote_box == base_box or (local.to_data() if local else {}) != base_box or not 0 <= slot < SLOTS:
+                    continue
+                if remote_box:
+                    if self.pages[page] is None:
+                        self.pages[page] = {}
+                    self.pages[page][slot] = Box.from_data(remote_box)
+                else:
+                    self.clear(page, slot)
+                changes.append((page, slot, local))
+        if remote.get("warm", []) != base.get("warm", []) and sorted(self.warm) == base.get("warm", []):
+            self.warm = set(remote.get("warm", ()))
+        if remote.get("macros", {}) != base.get("macros", {}) and self.macros == base.get("macros", {}):
+            self.macros = {name: list(scripts) for name, scripts in remote.get("macros", {}).items()}
+        return changes
+
+    def insert_page(self, index):
+        self.pages.insert(index, None)
+
+    def delete_page(self, index):
+        if len(self.pages) > 1:
+            del self.pages[index]
+
+    def move_page(self, source, destination):
+        self.pages.insert(destination, self.pages.pop(source))
+
+    def compact(self):
+        """Drop empty boxes and collapse pages that no longer hold any."""
+        for page, boxes in enumerate(self.pages):
+            if boxes is None:
+                continue
+            for slot in [slot for slot, box in boxes.items() if box.is_empty()]:
+                del boxes[slot]
+            if not boxes:
+                self.pages[page] = None
+
+    def to_data(self):
+        self.compact()
+        return {
+            "version": STORE_VERSION,
+            "pages": [{str(slot): box.to_data() for slot, box in boxes.items()} if boxes else {} for boxes in self.pages],
+            "warm": sorted(self.warm),
+            "macros": {name: list(scripts) for name, scripts in self.macros.items()},
+        }
+
+    @classmethod
+    def from_data(cls, data):
+        if data.get("version", 1) < 2:
+            return cls.from_legacy(data.get("total_sub_windows", TOTAL_SUB_WINDOWS), data.get("scripts", {}), data.get("colors", {}))
+        pages = data.get("pages") or [{}]
+        wall = cls(len(pages))
+        for page, boxes in enumerate(pages):
+            for slot, box_data in boxes.items():
+                box = Box.from_data(box_data)
+                if not box.is_empty() and 0 <= int(slot) < SLOTS:
+                    if wall.pages[page] is None:
+                        wall.pages[page] = {}
+                    wall.pages[page][int(slot)] = box
+        wall.warm = set(data.get("warm", ()))
+        wall.macros = {name: list(scripts) for name, scripts in data.get("macros", {}).items()}
+        return wall
+
+    @classmethod
+    def from_legacy(cls, total_sub_windows, scripts, colors):
+        """Build a wall from "box_N" keyed dicts, dropping boxes past the last page."""
+        wall = cls(total_sub_windows)
+        for key, script in scripts.items():
+            page, slot = divmod(int(key[4:]), SLOTS)
+            if page < len(wall):
+                wall.set_script(page, slot, script)
+        for key, color in colors.items():
+            page, slot = divmod(int(key[4:]), SLOTS)
+            if page < len(wall):
+                wall.set_color(page, slot, color)
+        return wall
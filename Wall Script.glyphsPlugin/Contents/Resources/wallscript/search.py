@@ -0,0 +1,200 @@
+# encoding: utf-8
+
+"""Incremental fuzzy search over the scripts on the wall."""
+
+import os
+import re
+import heapq
+from collections import defaultdict
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def transpositions(query):
+    """query and every variant of it with two neighbouring letters swapped."""
+    variants = [query]
+    for i in range(len(query) - 1):
+        if query[i] != query[i + 1]:
+            variants.append(query[:i] + query[i + 1] + query[i] + query[i + 2:])
+    return variants
+
+
+def subsequence_pattern(variants):
+    """A regex matching text that contains any of variants as a subsequence."""
+    return re.compile("|".join(".*?".join(re.escape(char) for char in variant) for variant in variants), re.S)
+
+
+def is_subsequence(query, text):
+    position = 0
+    for char in query:
+        position = text.find(char, position) + 1
+        if not position:
+            return False
+    return True
+
+
+class ScriptIndex(object):
+    """Trigram index of script paths, basenames and menu titles.
+
+    A script assigned to several boxes is indexed once; add() and remove()
+    keep a count per path, so the index can follow every box edit. Names
+    are also indexed by letter, to narrow the subsequence scan that short
+    and mistyped queries fall back to.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._names = {}
+        self._texts = {}
+        self._postings = defaultdict(set)
+        self._letters = defaultdict(set)
+        self._by_length = None
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __contains__(self, path):
+        return path in self._counts
+
+    @classmethod
+    def from_paths(cls, paths):
+        index = cls()
+        for path in paths:
+            index.add(path)
+        return index
+
+    @classmethod
+    def from_wall(cls, wall):
+        index = cls()
+        for _, _, box in wall.boxes():
+            if box.script:
+                index.add(box.script, box.title)
+        return index
+
+    def add(self, path, title=None):
+        count = self._counts.get(path, 0)
+        self._counts[path] = count + 1
+        if count:
+            return
+        name = title or os.path.splitext(os.path.basename(path))[0]
+        self._names[path] = name.lower()
+        self._by_length = None
+        for letter in set(self._names[path]):
+            self._letters[letter].add(path)
+        self._texts[path] = f"{path}\n{title}".lower() if title else path.lower()
+        for gram in trigrams(self._texts[path]):
+            self._postings[gram].add(path)
+
+    def remove(self, path):
+        count = self._counts.get(path, 0)
+        if count > 1:
+            self._counts[path] = count - 1
+            return
+        if not count:
+            return
+        del self._counts[path]
+        self._by_length = None
+        for letter in set(self._names.pop(path)):
+            paths = self._letters[letter]
+            paths.discard(path)
+            if not paths:
+                del self._letters[letter]
+        for gram in trigrams(self._texts.pop(path)):
+            postings = self._postings[gram]
+            postings.discard(path)
+            if not postings:
+                del self._postings[gram]
+
+    def search(self, query, limit=10):
+        """Return up to limit paths matching query, best match first."""
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        grams = trigrams(query)
+        if not grams:
+            names = self._names
+            contained = [path for path in self._letters.get(query[0], ()) if query in names[path]]
+            ranked = self.rank(query, contained, {}, limit)
+            return ranked + self.scan(query, limit - len(ranked), set(contained)) if len(ranked) < limit else ranked
+
+        # Paths containing every trigram of the query, intersecting the rarest first
+        postings = sorted((self._postings.get(gram, ()) for gram in grams), key=len)
+        matches = set(postings[0])
+        for paths in postings[1:]:
+            if not matches:
+                break
+            matches.intersection_update(paths)
+
+        # Too few of those: also accept paths sharing half of the trigrams
+        shared = {}
+        if len(matches) < limit:
+            counts = defaultdict(int)
+            for paths in postings:
+                for path in paths:
+                    counts[path] += 1
+            needed = max(1, len(grams) // 2)
+            shared = {path: count - len(grams) for path, count in counts.items() if count >= needed and path not in matches}
+
+        ranked = self.rank(query, list(matches) + list(shared), shared, limit)
+        if len(ranked) < limit:
+            # Still too few, as with mistyped queries: fill up from the subsequence scan
+            ranked += self.scan(query, limit - len(ranked), matches.union(shared))
+        return ranked
+
+    def scan(self, query, limit, exclude=()):
+        """Up to limit paths, shortest name first, whose name contains query as a
+        subsequence, or query with two neighbouring letters swapped.
+
+        Every such name has all the letters of query, so only those are
+        checked, and the scan stops as soon as it has found limit paths.
+        """
+        letters = sorted((self._letters.get(letter, ()) for letter in set(query)), key=len)
+        candidates = set(letters[0])
+        for paths in letters[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(paths)
+        candidates.difference_update(exclude)
+        if not candidates:
+            return []
+
+        names = self._names
+        if self._by_length is None:
+            self._by_length = sorted(names, key=lambda path: (len(names[path]), path))
+        if len(candidates) * 8 < len(self._by_length):
+            order = sorted(candidates, key=lambda path: (len(names[path]), path))
+        else:
+            order = (path for path in self._by_length if path in candidates)
+        search = subsequence_pattern(transpositions(query)).search
+        found = []
+        for path in order:
+            if search(names[path]):
+                found.append(path)
+                if len(found) == limit:
+                    break
+        return found
+
+    def rank(self, query, paths, shared, limit):
+        names = self._names
+        texts = self._texts
+
+        def key(path):
+            name = names[path]
+            if name == query:
+                tier = 0
+            elif name.startswith(query):
+                tier = 1
+            elif query in name:
+                tier = 2
+            elif query in texts[path]:
+                tier = 3
+            elif is_subsequence(query, name):
+                tier = 4
+            else:
+                tier = 5
+            return (tier, -shared.get(path, 0), len(name), path)
+
+        return heapq.nsmallest(limit, paths, key=key)
@@ -0,0 +1,211 @@
+# encoding: utf-8
+
+"""Loading and saving the wall document."""
+
+import os
+import fcntl
+import atexit
+import threading
+from contextlib import contextmanager
+
+from .model import TOTAL_SUB_WINDOWS
+
+
+SAVE_DELAY = 0.5
+LOCK_SUFFIX = ".lock"
+RECOVERY_SUFFIX = " (unsaved).json"
+
+
+def write_json_atomic(path, data, indent=2):
+    """Write data to a temporary file next to path and rename it over path."""
+    import json
+    import tempfile
+    directory = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(prefix=".Wall Script.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(data, file, indent=indent)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class WallStore(object):
+    """Versioned JSON store for the wall.
+
+    save() only records the latest snapshot; it is written from a background
+    timer after SAVE_DELAY seconds, so a burst of edits costs a single write.
+    Every write goes to a temporary file that is renamed over the store.
+
+    Several Glyphs instances may share the store. Reads and writes hold an
+    flock on a sibling lock file, and every write bumps the document's
+    "revision". A write only goes through when the store is still at the
+    revision this instance last saw; otherwise on_conflict is called, so the
+    caller can merge the newer document (see poll() and Wall.merge()) and
+    save again. base is the last document read or written.
+
+    The conflicting snapshot is kept until a later write succeeds. Without
+    an on_conflict handler, or at exit when nothing is left to merge it, it
+    goes to recovery_path() instead of being lost.
+    """
+
+    def __init__(self, path, legacy_script_file=None, legacy_color_file=None, delay=SAVE_DELAY, on_conflict=None):
+        self.path = path
+        self.legacy_script_file = legacy_script_file
+        self.legacy_color_file = legacy_color_file
+        self.delay = delay
+        self.on_conflict = on_conflict
+        self.base = None
+        self.revision = 0
+        self.conflicts = 0
+        self.conflicted = None
+        self._stamp = None
+        self._pending = None
+        self._timer = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        atexit.register(self.close)
+
+    @contextmanager
+    def locked(self):
+        """Hold an exclusive lock shared with other processes using this store."""
+        with open(self.path + LOCK_SUFFIX, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def stamp(self):
+        """(mtime_ns, size) of the store file, or None when it does not exist."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def read(self):
+        """The document on disk, or None. Call with the lock held."""
+        import json
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def load(self):
+        with self._write_lock, self.locked():
+            data = self.read()
+            if data is None:
+                data = self.migrate()
+                self.write(data)
+            else:
+                self._accept(data)
+        return data
+
+    def accept(self, data):
+        """Record data as the document this instance is in sync with."""
+        with self._write_lock:
+            self._accept(data)
+
+    def _accept(self, data):
+        self.base = data
+        self.revision = data.get("revision", 0)
+        self._stamp = self.stamp()
+
+    def poll(self):
+        """A newer document written by another instance, or None.
+
+        Costs a single stat() while the file is unchanged. Call accept() with
+        the returned document once it has been merged into the live wall.
+        """
+        stamp = self.stamp()
+        if stamp is None or stamp == self._stamp:
+            return None
+        with self.locked():
+            data = self.read()
+        if data is None or data.get("revision", 0) == self.revision:
+            self._stamp = stamp
+            return None
+        return data
+
+    def migrate(self):
+        """Build a version 1 document from the legacy script and color files."""
+        data = {"version": 1, "total_sub_windows": TOTAL_SUB_WINDOWS, "scripts": {}, "colors": {}}
+        if self.legacy_script_file and os.path.exists(self.legacy_script_file):
+            with open(self.legacy_script_file, 'r', encoding='utf-8') as file:
+                for line in file:
+                    if '=' not in line:
+                        continue
+                    key, value = line.strip().split('=', 1)
+                    if key == "TOTAL_SUB_WINDOWS":
+                        data["total_sub_windows"] = int(value)
+                    elif key.startswith("box_"):
+                        data["scripts"][key] = value
+        if self.legacy_color_file and os.path.exists(self.legacy_color_file):
+            import json
+            with open(self.legacy_color_file, 'r', encoding='utf-8') as file:
+                data["colors"] = json.load(file)
+        return data
+
+    def save(self, data):
+        with self._lock:
+            self._pending = data
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self, recover=False):
+        with self._write_lock:
+            with self._lock:
+                data, self._pending = self._pending, None
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if data is not None and not self.write_if_current(data):
+                self.conflicted = data
+                if self.on_conflict is None:
+                    recover = True
+                else:
+                    self.on_conflict()
+            if recover and self.conflicted is not None:
+                self.recover(self.conflicted)
+
+    def close(self):
+        """Flush at exit, when a conflict can no longer be merged."""
+        self.flush(recover=True)
+
+    def recovery_path(self):
+        return os.path.splitext(self.path)[0] + RECOVERY_SUFFIX
+
+    def recover(self, data):
+        """Keep a snapshot that lost a conflict next to the store."""
+        path = self.recovery_path()
+        try:
+            write_json_atomic(path, data)
+        except OSError as e:
+            print(f"Wall Script: another Glyphs saved the wall first and the unsaved changes could not be kept: {e}")
+            return
+        self.conflicted = None
+        print(f"Wall Script: another Glyphs saved the wall first; the unsaved changes were kept in {path}")
+
+    def write_if_current(self, data):
+        """Write data unless another instance saved since our last read or write."""
+        with self.locked():
+            current = self.read()
+            if current is not None and current.get("revision", 0) != self.revision:
+                self.conflicts += 1
+                return False
+            self.write(data)
+        self.conflicted = None
+        return True
+
+    def write(self, data):
+        """Write data as the next revision. Call with the lock held."""
+        data = dict(data, revision=self.revision + 1)
+        write_json_atomic(self.path, data)
+        self._accept(data)
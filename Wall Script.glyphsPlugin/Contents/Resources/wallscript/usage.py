@@ -0,0 +1,120 @@
+# encoding: utf-8
+
+"""Launch counts that fade with time, for the Hot page."""
+
+import os
+import math
+import time
+import atexit
+import threading
+
+from .model import SLOTS
+from .store import write_json_atomic
+
+
+HALF_LIFE = 7 * 24 * 3600
+USAGE_SAVE_DELAY = 5.0
+
+
+def logaddexp2(a, b):
+    """log2(2 ** a + 2 ** b) without overflowing."""
+    if a < b:
+        a, b = b, a
+    return a + math.log2(1.0 + 2.0 ** (b - a))
+
+
+class UsageCounter(object):
+    """Launch scores by script path, each launch's weight halving every half_life seconds.
+
+    A launch at time t adds 2 ** (t / half_life) to its script's score, so
+    older launches never have to be decayed: comparing scores gives the
+    same order as comparing the decayed counts. Scores are kept as log2 to
+    stay finite. The size highest scoring scripts are kept in order in top
+    and updated with every launch. Like WallStore, save() only records a
+    snapshot that a background timer writes after delay seconds.
+    """
+
+    def __init__(self, path=None, half_life=HALF_LIFE, size=SLOTS, delay=USAGE_SAVE_DELAY):
+        self.path = path
+        self.half_life = half_life
+        self.size = size
+        self.delay = delay
+        self.scores = {}
+        self._pending = None
+        self._timer = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        if path and os.path.exists(path):
+            import json
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    data = json.load(file)
+                if data.get("half_life") == half_life:
+                    self.scores = data.get("scores", {})
+            except (OSError, ValueError):
+                self.scores = {}
+        self.top = []
+        self.rank()
+        atexit.register(self.flush)
+
+    def rank(self):
+        self.top = sorted(self.scores, key=self.scores.get, reverse=True)[:self.size]
+
+    def record(self, script, when=None):
+        if when is None:
+            when = time.time()
+        weight = when / self.half_life
+        score = self.scores.get(script)
+        score = self.scores[script] = weight if score is None else logaddexp2(score, weight)
+        if script in self.top:
+            self.top.remove(script)
+        elif len(self.top) == self.size:
+            if score <= self.scores[self.top[-1]]:
+                return
+            self.top.pop()
+        position = len(self.top)
+        while position and self.scores[self.top[position - 1]] < score:
+            position -= 1
+        self.top.insert(position, script)
+
+    def count(self, script, when=None):
+        """The decayed launch count of script at when."""
+        score = self.scores.get(script)
+        if score is None:
+            return 0.0
+        return 2.0 ** (score - (time.time() if when is None else when) / self.half_life)
+
+    def forget(self, *scripts):
+        ranked = False
+        for script in scripts:
+            if self.scores.pop(script, None) is not None and script in self.top:
+                ranked = True
+        if ranked:
+            self.rank()
+
+    def rename(self, old, new):
+        score = self.scores.pop(old, None)
+        if score is not None:
+            self.scores[new] = logaddexp2(score, self.scores[new]) if new in self.scores else score
+            self.rank()
+
+    def save(self):
+        if not self.path:
+            return
+        data = {"half_life": self.half_life, "scores": {script: round(score, 6) for script, score in self.scores.items()}}
+        with self._lock:
+            self._pending = data
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                data, self._pending = self._pending, None
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if data is not None:
+                write_json_atomic(self.path, data, indent=None)
@@ -0,0 +1,212 @@
+# encoding: utf-8
+
+"""Benchmarks for the headless Wall Script core.
+
+Builds a synthetic wall and times loading/saving, page switching and script
+dispatch and search. Every benchmark has a time budget; the script exits with status 1
+when one is exceeded, so it can be run before each release:
+
+    python benchmarks/bench_core.py --boxes 10000
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Wall Script.glyphsPlugin", "Contents", "Resources"))
+
+from wallscript import SLOTS, Wall, WallStore, LRUCache, BytecodeCache, CodeCache, ScriptIndex, ScriptRunner  # noqa: E402
+
+
+# Budgets in seconds per operation, generous enough for a slow laptop
+BUDGETS = {
+    "save (per 10k boxes)": 0.5,
+    "load (per 10k boxes)": 0.5,
+    "page switch": 0.0005,
+    "page switch (cached)": 0.0001,
+    "dispatch (cached)": 0.0005,
+    "dispatch (bytecode cache)": 0.005,
+    "search keystroke": 0.016,
+    "search keystroke (typos)": 0.016,
+}
+
+
+# plugin.py's render cache size; plugin.py itself needs Glyphs to import
+RENDER_CACHE_SIZE = 256
+
+
+def make_wall(boxes, fill=12):
+    """A wall with `boxes` assigned boxes, `fill` per page."""
+    wall = Wall((boxes + fill - 1) // fill)
+    for index in range(boxes):
+        page, slot = divmod(index, fill)
+        wall.set_script(page, slot, f"/Users/designer/Scripts/Folder {page % 20}/Script {index}.py")
+        if index % 3 == 0:
+            wall.set_color(page, slot, (0.5, 0.0, 0.25, 1.0))
+    return wall
+
+
+def timed(function, repeat):
+    """Best time of `repeat` calls of function."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_store(directory, boxes, repeat):
+    wall = make_wall(boxes)
+    store = WallStore(os.path.join(directory, "Wall Script.json"))
+    save = timed(lambda: store.write(wall.to_data()), repeat)
+    load = timed(lambda: Wall.from_data(store.load()), repeat)
+    return {"save (per 10k boxes)": save * 10000 / boxes, "load (per 10k boxes)": load * 10000 / boxes}
+
+
+def bench_page_switch(boxes, repeat):
+    """Rebind the 16 slots to each page the way plugin.py's update_subview does.
+
+    Every slot looks up its box, fetches the render for (script, title,
+    color, missing) from an LRUCache, building it on a miss as box_render
+    does minus the AppKit objects, and replaces the shown render only when
+    it is not the same object. Walking every page of a large wall
+    misses the cache on most pages; flipping between two pages hits it.
+    """
+    import textwrap
+
+    wall = make_wall(boxes)
+    missing_scripts = {box.script for index, (_, _, box) in enumerate(wall.boxes()) if index % 50 == 0}
+
+    def box_render(cache, box):
+        script = box.script if box is not None else None
+        title = box.title if box is not None else None
+        color = box.color if box is not None else None
+        missing = script in missing_scripts
+        render = cache.get((script, title, color, missing))
+        if render is None:
+            display_name = title or (os.path.basename(script) if script else "No Script")
+            if missing:
+                display_name = f"Missing: {display_name}"
+            render = ("\n".join(textwrap.wrap(display_name, width=19)), "red" if missing else color or ("blue" if script else "gray"))
+            cache.set((script, title, color, missing), render)
+        return render
+
+    def switcher():
+        cache = LRUCache(RENDER_CACHE_SIZE)
+        shown = [None] * SLOTS
+
+        def switch(page):
+            for slot in range(SLOTS):
+                render = box_render(cache, wall.box(page, slot))
+                if shown[slot] is not render:
+                    shown[slot] = render
+
+        return switch
+
+    def switch_all_pages():
+        switch = switcher()
+        for page in range(len(wall)):
+            switch(page)
+
+    def flip_pages():
+        switch = switcher()
+        for _ in range(len(wall)):
+            switch(0)
+            switch(1)
+
+    return {
+        "page switch": timed(switch_all_pages, repeat) / len(wall),
+        "page switch (cached)": timed(flip_pages, repeat) / (2 * len(wall)),
+    }
+
+
+def bench_search(boxes, repeat):
+    wall = make_wall(boxes)
+    index = ScriptIndex.from_paths(box.script for _, _, box in wall.boxes())
+
+    def keystrokes(*queries):
+        """Every prefix of queries, as typed one keystroke at a time."""
+        return [query[:length] for query in queries for length in range(1, len(query) + 1)]
+
+    def type_queries(prefixes):
+        for prefix in prefixes:
+            index.search(prefix)
+
+    exact = keystrokes("script 12")
+    # Swapped and missing letters fall back to the subsequence scan
+    typos = keystrokes("scirpt 12", "scrpt12", "sc12")
+    return {
+        "search keystroke": timed(lambda: type_queries(exact), repeat) / len(exact),
+        "search keystroke (typos)": timed(lambda: type_queries(typos), repeat) / len(typos),
+    }
+
+
+def bench_dispatch(directory, scripts, repeat):
+    paths = []
+    for index in range(scripts):
+        path = os.path.join(directory, f"script_{index}.py")
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write("# MenuTitle: Benchmark %d\n" % index)
+            file.write("def helper(values):\n    return sum(v * v for v in values)\n\n")
+            file.write("total = helper(range(%d))\n" % (index % 50))
+        paths.append(path)
+
+    bytecode_cache = BytecodeCache(os.path.join(directory, "cache"))
+    for path in paths:
+        bytecode_cache.warm(path)
+
+    def run_all(runner):
+        for path in paths:
+            error = runner.run(path)
+            if error is not None:
+                raise RuntimeError(error)
+
+    # A fresh CodeCache per call so every run goes through the on-disk cache
+    cold = timed(lambda: run_all(ScriptRunner(CodeCache(scripts, bytecode_cache))), repeat)
+    runner = ScriptRunner(CodeCache(scripts, bytecode_cache))
+    run_all(runner)
+    warm = timed(lambda: run_all(runner), repeat)
+    return {"dispatch (cached)": warm / scripts, "dispatch (bytecode cache)": cold / scripts}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boxes", type=int, default=10000, help="assigned boxes on the synthetic wall")
+    parser.add_argument("--scripts", type=int, default=200, help="script files used for the dispatch benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark, the best one counts")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    options = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="wallscript-bench-")
+    try:
+        results = {}
+        results.update(bench_store(directory, options.boxes, options.repeat))
+        results.update(bench_page_switch(options.boxes, options.repeat))
+        results.update(bench_search(options.boxes, options.repeat))
+        results.update(bench_dispatch(directory, options.scripts, options.repeat))
+    finally:
+        shutil.rmtree(directory)
+
+    if options.json:
+        print(json.dumps(results, indent=2))
+
+    failed = False
+    for name, elapsed in results.items():
+        budget = BUDGETS.get(name)
+        over = budget is not None and elapsed > budget
+        failed = failed or over
+        if not options.json:
+            print(f"{name:<28} {elapsed * 1000:10.3f} ms   budget {budget * 1000:8.3f} ms{'   OVER BUDGET' if over else ''}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# encoding: utf-8
+
+"""Startup budget for the Wall Script plugin.
+
+Glyphs imports plugin.py and calls settings() at every launch, whether the
+wall is opened or not. This times `import wallscript` in a fresh
+interpreter and lists the deferred modules that import loaded. It also
+checks plugin.py without running it: its top-level imports may only pull
+in what the menu item needs, and settings() may not read files. Exits
+with status 1 when the budget is exceeded or a check fails:
+
+    python benchmarks/bench_startup.py
+"""
+
+from __future__ import print_function
+
+import os
+import ast
+import sys
+import json
+import argparse
+import subprocess
+
+RESOURCES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Wall Script.glyphsPlugin", "Contents", "Resources")
+
+# Budget in seconds, generous enough for a slow laptop
+IMPORT_BUDGET = 0.05
+
+# Modules plugin.py and wallscript may only import inside the functions that use them
+DEFERRED_MODULES = {"vanilla", "textwrap", "json", "concurrent", "tempfile", "cProfile", "ast"}
+# The only AppKit name needed before the wall is opened
+EAGER_APPKIT = {"NSMenuItem"}
+# Methods that read files or start work, and so must wait for showWindow_
+DEFERRED_CALLS = {"load", "load_wall", "warm_up", "start_integrity_scan", "scan"}
+
+# Prints the import time, then every module the import loaded, one per line
+IMPORT_TIMER = """
+import sys, time
+before = set(sys.modules)
+start = time.perf_counter()
+import wallscript
+elapsed = time.perf_counter() - start
+print(elapsed)
+print("\\n".join(sorted(set(sys.modules) - before)))
+"""
+
+
+def bench_import(repeat):
+    """Best time of `repeat` imports of wallscript, each in a new interpreter, and the deferred modules it loaded."""
+    best = None
+    loaded = set()
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, "-c", IMPORT_TIMER], cwd=RESOURCES).decode('utf-8').split()
+        elapsed, modules = float(output[0]), output[1:]
+        loaded.update(module for module in modules if module.split(".")[0] in DEFERRED_MODULES)
+        best = elapsed if best is None else min(best, elapsed)
+    return best, sorted(loaded)
+
+
+def check_plugin(path):
+    """Return a list of problems with what plugin.py does at import and in settings()."""
+    with open(path, 'r', encoding='utf-8') as file:
+        tree = ast.parse(file.read(), path)
+    problems = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            modules = [node.module or ""]
+            if node.module == "AppKit":
+                problems.extend(f"line {node.lineno}: AppKit.{alias.name} imported at startup" for alias in node.names if alias.name not in EAGER_APPKIT)
+        else:
+            continue
+        problems.extend(f"line {node.lineno}: {module} imported at startup" for module in modules if module.split(".")[0] in DEFERRED_MODULES)
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and node.name == "settings":
+            for call in ast.walk(node):
+                if isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute) and call.func.attr in DEFERRED_CALLS:
+                    problems.append(f"line {call.lineno}: settings() calls {call.func.attr}()")
+                elif isinstance(call, ast.Call) and isinstance(call.func, ast.Name) and call.func.id == "open":
+                    problems.append(f"line {call.lineno}: settings() opens a file")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="imports to time, the best one counts")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    options = parser.parse_args(argv)
+
+    elapsed, loaded = bench_import(options.repeat)
+    problems = [f"wallscript imports {module} at startup" for module in loaded]
+    problems.extend(f"plugin.py {problem}" for problem in check_plugin(os.path.join(RESOURCES, "plugin.py")))
+    over = elapsed > IMPORT_BUDGET
+
+    if options.json:
+        print(json.dumps({"import wallscript": elapsed, "problems": problems}, indent=2))
+    else:
+        print(f"{'import wallscript':<28} {elapsed * 1000:10.3f} ms   budget {IMPORT_BUDGET * 1000:8.3f} ms{'   OVER BUDGET' if over else ''}")
+        for problem in problems:
+            print(problem)
+    return 1 if over or problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
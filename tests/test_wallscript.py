@@ -0,0 +1,322 @@
+# encoding: utf-8
+
+"""Tests for the headless Wall Script core.
+
+Nothing here needs Glyphs, AppKit or vanilla:
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Wall Script.glyphsPlugin", "Contents", "Resources"))
+
+from wallscript import SLOTS, HALF_LIFE, Wall, WallStore, KeyMap, RelocationIndex, ScriptIndex, UsageCounter, file_digest  # noqa: E402
+from wallscript.keymap import KEY_CODES, MODIFIER_FLAGS  # noqa: E402
+
+
+def write_file(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    return path
+
+
+# Wall.merge
+
+def test_merge_takes_remote_edits_to_untouched_boxes():
+    wall = Wall(2)
+    wall.set_script(0, 0, "/a.py")
+    base = wall.to_data()
+    remote = Wall.from_data(base)
+    remote.set_script(0, 1, "/b.py")
+    remote.set_color(0, 0, (1.0, 0.0, 0.0, 1.0))
+
+    changes = wall.merge(base, remote.to_data())
+
+    assert wall.box(0, 1).script == "/b.py"
+    assert wall.box(0, 0).color == (1.0, 0.0, 0.0, 1.0)
+    assert sorted((page, slot) for page, slot, _ in changes) == [(0, 0), (0, 1)]
+
+
+def test_merge_keeps_local_edits_to_the_same_box():
+    wall = Wall(1)
+    wall.set_script(0, 0, "/a.py")
+    base = wall.to_data()
+    remote = Wall.from_data(base)
+    remote.set_script(0, 0, "/remote.py")
+    wall.set_script(0, 0, "/local.py")
+
+    assert wall.merge(base, remote.to_data()) == []
+    assert wall.box(0, 0).script == "/local.py"
+
+
+def test_merge_clears_boxes_removed_remotely():
+    wall = Wall(1)
+    wall.set_script(0, 3, "/a.py")
+    base = wall.to_data()
+    remote = Wall.from_data(base)
+    remote.clear(0, 3)
+
+    changes = wall.merge(base, remote.to_data())
+
+    assert wall.box(0, 3) is None or wall.box(0, 3).is_empty()
+    assert [(page, slot, old.script) for page, slot, old in changes] == [(0, 3, "/a.py")]
+
+
+def test_merge_follows_remote_page_count_and_macros():
+    wall = Wall(2)
+    base = wall.to_data()
+    remote = Wall.from_data(base)
+    remote.insert_page(2)
+    remote.set_script(2, 0, "/c.py")
+    remote.macros["Both"] = ["/a.py", "/c.py"]
+    remote.warm.add("/c.py")
+
+    wall.merge(base, remote.to_data())
+
+    assert len(wall) == 3
+    assert wall.box(2, 0).script == "/c.py"
+    assert wall.macros == {"Both": ["/a.py", "/c.py"]}
+    assert wall.warm == {"/c.py"}
+
+
+def test_merge_keeps_local_macros():
+    wall = Wall(1)
+    base = wall.to_data()
+    remote = Wall.from_data(base)
+    remote.macros["Remote"] = ["/r.py"]
+    wall.macros["Local"] = ["/l.py"]
+
+    wall.merge(base, remote.to_data())
+
+    assert wall.macros == {"Local": ["/l.py"]}
+
+
+# WallStore
+
+def test_store_writes_only_on_top_of_the_revision_it_read(tmp_path):
+    path = str(tmp_path / "Wall Script.json")
+    first = WallStore(path, delay=60)
+    second = WallStore(path, delay=60)
+    first.load()
+    second.load()
+    assert first.revision == second.revision == 1
+
+    wall = Wall.from_data(first.base)
+    wall.set_script(0, 0, "/a.py")
+    assert first.write_if_current(wall.to_data())
+    assert first.revision == 2
+
+    stale = Wall.from_data(second.base)
+    stale.set_script(0, 1, "/b.py")
+    assert not second.write_if_current(stale.to_data())
+    assert second.conflicts == 1
+    assert second.revision == 1
+
+
+def test_store_poll_returns_newer_documents_once(tmp_path):
+    path = str(tmp_path / "Wall Script.json")
+    first = WallStore(path, delay=60)
+    second = WallStore(path, delay=60)
+    first.load()
+    second.load()
+    assert second.poll() is None
+
+    wall = Wall.from_data(first.base)
+    wall.set_script(0, 0, "/a.py")
+    first.write_if_current(wall.to_data())
+
+    remote = second.poll()
+    assert remote is not None and remote["revision"] == 2
+    local = Wall.from_data(second.base)
+    local.merge(second.base, remote)
+    second.accept(remote)
+    assert local.box(0, 0).script == "/a.py"
+    assert second.poll() is None
+    assert second.write_if_current(local.to_data())
+    assert first.poll()["revision"] == 3
+
+
+def test_store_keeps_conflicting_snapshot_at_exit(tmp_path):
+    path = str(tmp_path / "Wall Script.json")
+    conflicts = []
+    first = WallStore(path, delay=60, on_conflict=lambda: conflicts.append(True))
+    second = WallStore(path, delay=60)
+    first.load()
+    second.load()
+
+    wall = Wall.from_data(second.base)
+    wall.set_script(0, 0, "/b.py")
+    second.save(wall.to_data())
+    second.flush()
+    wall = Wall.from_data(first.base)
+    wall.set_script(0, 1, "/a.py")
+    first.save(wall.to_data())
+    first.flush()
+    assert conflicts == [True]
+    assert first.conflicted is not None
+
+    first.close()
+    assert first.conflicted is None
+    assert os.path.exists(first.recovery_path())
+
+
+# Legacy migration
+
+def test_migrate_reads_legacy_files(tmp_path):
+    script_file = write_file(str(tmp_path / "scripts.txt"), "TOTAL_SUB_WINDOWS=2\nbox_0=/a.py\nbox_17=/b.py\nbox_40=/past.py\n")
+    color_file = write_file(str(tmp_path / "colors.json"), '{"box_17": [0.5, 0.0, 0.25, 1.0]}')
+    store = WallStore(str(tmp_path / "Wall Script.json"), script_file, color_file, delay=60)
+
+    data = store.load()
+    wall = Wall.from_data(data)
+
+    assert data["version"] == 1
+    assert len(wall) == 2
+    assert wall.box(0, 0).script == "/a.py"
+    assert wall.box(1, 1).script == "/b.py"
+    assert tuple(wall.box(1, 1).color) == (0.5, 0.0, 0.25, 1.0)
+    assert [box.script for _, _, box in wall.boxes()] == ["/a.py", "/b.py"]
+    assert os.path.exists(store.path)
+
+
+def test_from_legacy_drops_boxes_past_the_last_page():
+    wall = Wall.from_legacy(1, {"box_2": "/a.py", f"box_{SLOTS}": "/b.py"}, {"box_2": (0.0, 0.0, 1.0, 1.0)})
+
+    assert len(wall) == 1
+    assert wall.box(0, 2).script == "/a.py"
+    assert wall.box(0, 2).color == (0.0, 0.0, 1.0, 1.0)
+    assert Wall.from_data(wall.to_data()).box(0, 2).script == "/a.py"
+
+
+# UsageCounter
+
+def test_usage_top_orders_by_launch_count():
+    usage = UsageCounter()
+    usage.record("/a.py", 0)
+    usage.record("/b.py", 0)
+    usage.record("/b.py", 0)
+    usage.record("/c.py", 0)
+    usage.record("/c.py", 0)
+    usage.record("/c.py", 0)
+
+    assert usage.top == ["/c.py", "/b.py", "/a.py"]
+    assert round(usage.count("/c.py", 0), 6) == 3.0
+
+
+def test_usage_recent_launches_outweigh_old_ones():
+    usage = UsageCounter()
+    for _ in range(3):
+        usage.record("/old.py", 0)
+    usage.record("/new.py", 2 * HALF_LIFE)
+
+    assert usage.top == ["/new.py", "/old.py"]
+    assert round(usage.count("/old.py", 2 * HALF_LIFE), 6) == 0.75
+
+
+def test_usage_top_is_limited_to_size():
+    usage = UsageCounter(size=2)
+    for index, script in enumerate(["/a.py", "/b.py", "/c.py"]):
+        for _ in range(index + 1):
+            usage.record(script, 0)
+
+    assert usage.top == ["/c.py", "/b.py"]
+    usage.forget("/c.py")
+    assert usage.top == ["/b.py", "/a.py"]
+
+
+# KeyMap
+
+def test_keymap_dispatch():
+    keymap = KeyMap()
+    control = MODIFIER_FLAGS["control"]
+
+    assert keymap.dispatch(KEY_CODES["1"], 0) == ("slot", 0)
+    assert keymap.dispatch(KEY_CODES["q"], 0) == ("slot", 4)
+    assert keymap.dispatch(KEY_CODES["v"], MODIFIER_FLAGS["shift"]) == ("slot", SLOTS - 1)
+    assert keymap.dispatch(KEY_CODES["3"], control) == ("page", 2)
+    assert keymap.dispatch(KEY_CODES["0"], control) == ("page", 9)
+    assert keymap.dispatch(KEY_CODES["q"], control) is None
+    assert keymap.dispatch(KEY_CODES["1"], MODIFIER_FLAGS["command"]) is None
+    assert keymap.dispatch(KEY_CODES["p"], 0) is None
+
+
+def test_keymap_rejects_bad_layouts():
+    for slot_keys, page_modifier in [("1234", "control"), ("1" * SLOTS, "control"), ("1234qwerasdfzxcv", "hyper")]:
+        try:
+            KeyMap(slot_keys, page_modifier)
+        except ValueError:
+            continue
+        raise AssertionError(f"KeyMap accepted {slot_keys!r}, {page_modifier!r}")
+
+
+# RelocationIndex
+
+def test_relocation_prefers_same_contents(tmp_path):
+    root = str(tmp_path)
+    moved = write_file(os.path.join(root, "New", "Renamed.py"), "print('kern')\n")
+    write_file(os.path.join(root, "Other", "Kern.py"), "print('other')\n")
+    index = RelocationIndex().scan(root)
+
+    assert len(index) == 2
+    assert index.locate("/Old/Kern.py", file_digest(moved)) == moved
+
+
+def test_relocation_by_name_needs_a_single_best_match(tmp_path):
+    root = str(tmp_path)
+    kerning = write_file(os.path.join(root, "Kerning", "Tools", "Check.py"), "a = 1\n")
+    write_file(os.path.join(root, "Spacing", "Check.py"), "b = 1\n")
+    write_file(os.path.join(root, "Unique", "Only.py"), "c = 1\n")
+    write_file(os.path.join(root, "A", "Same.py"), "d = 1\n")
+    write_file(os.path.join(root, "B", "Same.py"), "e = 1\n")
+    index = RelocationIndex().scan(root)
+
+    assert index.locate("/Users/old/Kerning/Tools/Check.py") == kerning
+    assert index.locate("/Users/old/Only.py") == os.path.join(root, "Unique", "Only.py")
+    assert index.locate("/Users/old/Same.py") is None
+    assert index.locate("/Users/old/Gone.py") is None
+
+
+# ScriptIndex
+
+SCRIPTS = [
+    "/Scripts/Kerning/Kern Pairs.py",
+    "/Scripts/Kerning/Make Kerning Groups.py",
+    "/Scripts/Spacing/Space Check.py",
+    "/Scripts/Spacing/Spacing Report.py",
+    "/Scripts/Paths/Remove Overlap.py",
+]
+
+
+def test_search_ranks_prefix_matches_first():
+    index = ScriptIndex.from_paths(SCRIPTS)
+
+    assert index.search("kern")[:2] == ["/Scripts/Kerning/Kern Pairs.py", "/Scripts/Kerning/Make Kerning Groups.py"]
+    assert index.search("space check")[0] == "/Scripts/Spacing/Space Check.py"
+    assert index.search("") == []
+
+
+def test_search_finds_subsequences_and_swapped_letters():
+    index = ScriptIndex.from_paths(SCRIPTS)
+
+    assert index.search("krn")[0] == "/Scripts/Kerning/Kern Pairs.py"
+    assert index.search("kenr")[0] == "/Scripts/Kerning/Kern Pairs.py"
+    assert index.search("spce")[0] == "/Scripts/Spacing/Space Check.py"
+    assert "/Scripts/Kerning/Make Kerning Groups.py" in index.search("akr")
+    assert index.search("zzz") == []
+
+
+def test_search_follows_add_and_remove():
+    index = ScriptIndex.from_paths(SCRIPTS)
+    index.add(SCRIPTS[0])
+    index.remove(SCRIPTS[0])
+    assert SCRIPTS[0] in index.search("pairs")
+
+    index.remove(SCRIPTS[0])
+    assert SCRIPTS[0] not in index
+    assert index.search("pairs") == []
+
+    index.add("/Scripts/Other.py", "Kern Audit")
+    assert index.search("kern audit") == ["/Scripts/Other.py"]